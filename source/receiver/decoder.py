@@ -23,7 +23,8 @@ logger = logging.getLogger(__name__)
 
 _RAW_FMT = "<Ihhhhhhhhhfff" 
 _RAW_SCALES = (1, 1000, 1000, 1000, 10, 10, 10, 10, 10, 10, 1.0, 1.0, 1.0)
-_RAW_EXPECTED_LEN = struct.calcsize(_RAW_FMT)
+_RAW_STRUCT = struct.Struct(_RAW_FMT)  # 포맷 문자열을 한 번만 해석
+_RAW_EXPECTED_LEN = _RAW_STRUCT.size
 
 BAM_AUTOENCODER = None
 SCALER = None
@@ -69,7 +70,7 @@ def _decode_raw_payload(payload_chunk: bytes) -> Optional[Dict[str, Any]]:
         logger.error(f"Raw 디코딩: 길이 불일치. 기대 {_RAW_EXPECTED_LEN}B, 실제 {len(payload_chunk)}B.")
         return None
     try:
-        unpacked = struct.unpack(_RAW_FMT, payload_chunk)
+        unpacked = _RAW_STRUCT.unpack(payload_chunk)
         scaled_values = []
         for i, val in enumerate(unpacked):
             if i == 0: scaled_values.append(float(val))
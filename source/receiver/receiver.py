@@ -1,17 +1,40 @@
 # receiver.py
 # -*- coding: utf-8 -*-
 from __future__ import annotations
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 import time
 import json
 import datetime
 import serial
 import struct
-import binascii
 import sys
 from typing import List, Optional, Dict, Any
 
+# --- 콘솔 로깅 ---
+# 프레임마다 여러 줄 찍히는 콘솔 로그(포맷팅 + stderr 쓰기)는 QueueListener 스레드가 담당하고, 수신 루프는 큐에 넣기만 한다.
+# 다른 모듈보다 먼저 설정해, import 되는 모듈의 basicConfig가 핸들러를 따로 달지 못하고
+# atexit(역순 실행)에서 리스너가 그 모듈들의 종료 처리 로그까지 출력한 뒤 멈추도록 한다.
+# 이미 로깅을 설정한 프로그램에서 import 하면 그 핸들러를 그대로 둔다.
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """레코드를 그대로 큐에 넣어 포맷팅까지 리스너 스레드에서 처리되도록 합니다."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+if __name__ == "__main__" or not logging.getLogger().handlers:
+    _log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _console_handler = logging.StreamHandler()
+    _console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, _console_handler, respect_handler_level=True)
+    logging.getLogger().addHandler(_DeferredQueueHandler(_log_queue)); logging.getLogger().setLevel(logging.INFO)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+logger = logging.getLogger(__name__)
+
 try:
     from decoder import decode_frame_payload
 except ImportError as e:
@@ -25,7 +48,8 @@ except ImportError:
 
 # ────────── 설정 ──────────
 PORT         = "/dev/ttyAMA0"
-BAUD         = 9600
+BAUD         = int(os.environ.get("CHIRP_BAUD", "9600"))  # E22 REG0의 UART 속도와 같아야 함
+SERIAL_WRITE_TIMEOUT = 2  # 초, 모듈이 멈춰도 ACK 송신에서 무한 대기하지 않도록
 SERIAL_READ_TIMEOUT = 0.05
 INITIAL_SYN_TIMEOUT = 7
 SYN_MSG            = b"SYN\r\n"
@@ -33,20 +57,21 @@ ACK_TYPE_HANDSHAKE = 0x00
 ACK_TYPE_DATA      = 0xAA
 QUERY_TYPE_SEND_REQUEST = 0x50
 ACK_TYPE_SEND_PERMIT  = 0x55
+QUERY_TYPE_WINDOW_REQUEST = 0x51  # [TYPE, 첫 SEQ, 개수] + 같은 무선 패킷에 이어지는 DATA 프레임들
+ACK_TYPE_DATA_BITMAP = 0xAB       # [TYPE, 첫 SEQ, 비트맵]: 창 안의 프레임은 개별 DATA_ACK 대신 비트맵 하나로 응답
 ACK_PACKET_LEN     = 2
 HANDSHAKE_ACK_SEQ  = 0x00
 EXPECTED_TOTAL_PACKETS = 100
-KNOWN_CONTROL_TYPES_FROM_SENDER = [QUERY_TYPE_SEND_REQUEST]
+_CTRL_RSP_STRUCT = struct.Struct("!BB")  # TYPE, SEQ
+KNOWN_CONTROL_TYPES_FROM_SENDER = [QUERY_TYPE_SEND_REQUEST, QUERY_TYPE_WINDOW_REQUEST]
 DATA_DIR = "data/raw"
 os.makedirs(DATA_DIR, exist_ok=True)
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-logger = logging.getLogger(__name__)
 
 def bytes_to_hex_pretty_str(data_bytes: bytes, bytes_per_line: int = 16) -> str:
     if not data_bytes: return "<empty>"
-    hex_str = binascii.hexlify(data_bytes).decode('ascii')
-    return "\n  ".join(' '.join(hex_str[i:i+j*2]) for i in range(0, len(hex_str), bytes_per_line*2) for j in range(bytes_per_line) if i+j*2 < len(hex_str))
+    h, step = data_bytes.hex(' '), bytes_per_line * 3  # 한 번의 C 호출로 "aa bb cc ..." 생성 후 줄 단위로 자름
+    return "\n  ".join(h[i:i+step-1] for i in range(0, len(h), step))
 
 def _log_json(payload: dict, meta: dict):
     fn = datetime.datetime.now().strftime("%Y-%m-%d") + ".jsonl"
@@ -57,23 +82,40 @@ def _log_json(payload: dict, meta: dict):
             "meta": meta
         }, ensure_ascii=False) + "\n")
 
-def _send_control_response(s: serial.Serial, seq: int, ack_type: int) -> bool:
-    ack_bytes = struct.pack("!BB", ack_type, seq)
-    ack_type_hex_str = f"0x{ack_type:02x}"
-    type_name_for_log_msg = {
-        ACK_TYPE_HANDSHAKE: "HANDSHAKE_ACK",
-        ACK_TYPE_DATA: "DATA_ACK",
-        ACK_TYPE_SEND_PERMIT: "SEND_PERMIT_ACK"
-    }.get(ack_type, f"UNKNOWN_TYPE_{ack_type_hex_str}")
+# 응답마다 새로 만들지 않도록 타입별 로그 이름·hex 문자열·CSV 이벤트 이름을 미리 만들어 둔다
+_CTRL_RSP_NAMES = {
+    t: (name, f"0x{t:02x}", f"{name}_SENT", f"{name}_FAIL")
+    for t, name in ((ACK_TYPE_HANDSHAKE, "HANDSHAKE_ACK"), (ACK_TYPE_DATA, "DATA_ACK"), (ACK_TYPE_SEND_PERMIT, "SEND_PERMIT_ACK"))
+}
+
+def _send_control_response(s: serial.Serial, seq: int, ack_type: int, drain: bool = True) -> bool:
+    ack_bytes = _CTRL_RSP_STRUCT.pack(ack_type, seq)
+    names = _CTRL_RSP_NAMES.get(ack_type)
+    if names is None:
+        unknown = f"UNKNOWN_TYPE_0x{ack_type:02x}"; names = (unknown, f"0x{ack_type:02x}", f"{unknown}_SENT", f"{unknown}_FAIL")
+    type_name_for_log_msg, ack_type_hex_str, sent_event, fail_event = names
+
+    try:
+        s.write(ack_bytes)
+        if drain: s.flush()
+        logger.info("CTRL RSP TX: TYPE=%s, SEQ=0x%02x", type_name_for_log_msg, seq)
+        log_rx_event(event_type=sent_event, ack_seq_sent=seq, ack_type_sent_hex=ack_type_hex_str)
+        return True
+    except Exception as e:
+        logger.error("CTRL RSP TX 실패 (TYPE=%s, SEQ=0x%02x): %s", ack_type_hex_str, seq, e)
+        log_rx_event(event_type=fail_event, ack_seq_sent=seq, ack_type_sent_hex=ack_type_hex_str, notes=str(e))
+        return False
 
+def _send_bitmap_ack(s: serial.Serial, first_seq: int, bitmap: int) -> bool:
+    ack_type_hex_str = f"0x{ACK_TYPE_DATA_BITMAP:02x}"
     try:
-        s.write(ack_bytes); s.flush()
-        logger.info(f"CTRL RSP TX: TYPE={type_name_for_log_msg}, SEQ=0x{seq:02x}")
-        log_rx_event(event_type=f"{type_name_for_log_msg}_SENT", ack_seq_sent=seq, ack_type_sent_hex=ack_type_hex_str)
+        s.write(bytes((ACK_TYPE_DATA_BITMAP, first_seq, bitmap))); s.flush()
+        logger.info("CTRL RSP TX: TYPE=DATA_BITMAP_ACK, SEQ=0x%02x, BITMAP=0x%02x", first_seq, bitmap)
+        log_rx_event(event_type="DATA_BITMAP_ACK_SENT", ack_seq_sent=first_seq, ack_type_sent_hex=ack_type_hex_str, notes=f"bitmap=0b{bitmap:08b}")
         return True
     except Exception as e:
-        logger.error(f"CTRL RSP TX 실패 (TYPE={ack_type_hex_str}, SEQ=0x{seq:02x}): {e}")
-        log_rx_event(event_type=f"{type_name_for_log_msg}_FAIL", ack_seq_sent=seq, ack_type_sent_hex=ack_type_hex_str, notes=str(e))
+        logger.error("CTRL RSP TX 실패 (TYPE=%s, SEQ=0x%02x): %s", ack_type_hex_str, first_seq, e)
+        log_rx_event(event_type="DATA_BITMAP_ACK_FAIL", ack_seq_sent=first_seq, ack_type_sent_hex=ack_type_hex_str, notes=str(e))
         return False
 
 # --- ### 로직 복원 및 개선 부분 ### ---
@@ -111,7 +153,7 @@ def _print_sensor_data(payload: Dict[str, Any], meta: Dict[str, Any]):
 def receive_loop(mode: str):
     ser: Optional[serial.Serial] = None
     try:
-        ser = serial.Serial(PORT, BAUD, timeout=INITIAL_SYN_TIMEOUT)
+        ser = serial.Serial(PORT, BAUD, timeout=INITIAL_SYN_TIMEOUT, write_timeout=SERIAL_WRITE_TIMEOUT)
         ser.inter_byte_timeout = 0.02
         logger.info(f"시리얼 포트 {PORT} 열기 성공.")
         log_rx_event(event_type="SERIAL_PORT_OPEN")
@@ -141,17 +183,26 @@ def receive_loop(mode: str):
     logger.info(f"핸드셰이크 완료. '{mode}' 모드로 데이터 수신 대기 중...")
     
     received_message_count = 0
+    pending_byte = b''  # RSSI 자리에서 읽힌, 같은 무선 패킷에 이어 붙은 다음 프레임의 첫 바이트
+    window = None  # 창 요청으로 열린 [첫 SEQ, 개수, 비트맵]; 무선 패킷이 끝나면 비트맵 ACK를 보내고 닫는다
     
     try:
         while True:
-            first_byte_data = ser.read(1)
+            first_byte_data = pending_byte or ser.read(1); pending_byte = b''
             if not first_byte_data: continue
             
             first_byte_val = first_byte_data[0]
             first_byte_hex = f"0x{first_byte_val:02x}"
 
-            # --- 제어 패킷 처리 (변경 없음) ---
-            if first_byte_val in KNOWN_CONTROL_TYPES_FROM_SENDER:
+            # --- 제어 패킷 처리 ---
+            if first_byte_val == QUERY_TYPE_WINDOW_REQUEST:
+                window_hdr = ser.read(2)
+                if len(window_hdr) == 2:
+                    window = [window_hdr[0], min(window_hdr[1], 8), 0]  # 비트맵은 1바이트
+                    log_rx_event(event_type="CTRL_PKT_RECV", frame_seq_recv=window_hdr[0], packet_type_recv_hex=first_byte_hex, notes=f"window_count={window_hdr[1]}")
+                continue
+
+            elif first_byte_val in KNOWN_CONTROL_TYPES_FROM_SENDER:
                 sequence_byte_data = ser.read(1)
                 if sequence_byte_data:
                     sequence_num = sequence_byte_data[0]
@@ -162,20 +213,28 @@ def receive_loop(mode: str):
             # --- 데이터 패킷 처리 ---
             elif 1 < first_byte_val <= 57: # LENGTH 바이트
                 content_len = first_byte_val
-                content_bytes = ser.read(content_len)
+                # 프레임 내용과 뒤따르는 RSSI(또는 다음 프레임의 첫 바이트)를 한 번의 read로 받는다
+                frame_and_trailer = ser.read(content_len + 1)
+                content_bytes, rssi_byte = frame_and_trailer[:content_len], frame_and_trailer[content_len:]
                 
                 rssi_dbm = None
                 if len(content_bytes) == content_len:
-                    rssi_byte = ser.read(1)
-                    if rssi_byte: rssi_dbm = -(256 - rssi_byte[0])
+                    # 송신기가 여러 프레임을 한 무선 패킷으로 보내면 RSSI는 패킷 끝에만 붙는다.
+                    # LEN(2~57)·제어 타입 값은 실제 RSSI(-(256-b) dBm)가 될 수 없으므로 다음 프레임의 시작으로 처리한다
+                    if rssi_byte and (1 < rssi_byte[0] <= 57 or rssi_byte[0] in KNOWN_CONTROL_TYPES_FROM_SENDER): pending_byte = rssi_byte
+                    elif rssi_byte: rssi_dbm = -(256 - rssi_byte[0])
                 
                 if len(content_bytes) == content_len:
                     frame_seq = content_bytes[0]
                     payload_chunk = content_bytes[1:]
                     
-                    logger.info(f"데이터 프레임 수신: LENGTH={content_len}B, FRAME_SEQ=0x{frame_seq:02x}, PAYLOAD_LEN={len(payload_chunk)}B, RSSI={rssi_dbm}dBm")
+                    logger.info("데이터 프레임 수신: LENGTH=%dB, FRAME_SEQ=0x%02x, PAYLOAD_LEN=%dB, RSSI=%sdBm", content_len, frame_seq, len(payload_chunk), rssi_dbm)
                     log_rx_event(event_type="DATA_FRAME_RECV", frame_seq_recv=frame_seq, rssi_dbm=rssi_dbm, data_len_byte_value=content_len, payload_len_on_wire=len(payload_chunk))
-                    _send_control_response(ser, frame_seq, ACK_TYPE_DATA)
+                    window_offset = (frame_seq - window[0]) % 256 if window else 256
+                    if window and window_offset < window[1]: window[2] |= 1 << window_offset
+                    # 같은 무선 패킷에 프레임이 더 남아 있으면 drain(tcdrain)은 마지막 ACK에서 한 번만 한다
+                    else: _send_control_response(ser, frame_seq, ACK_TYPE_DATA, drain=not pending_byte)
+                    if window and not pending_byte: _send_bitmap_ack(ser, window[0], window[2]); window = None
 
                     try:
                         payload_dict = decode_frame_payload(payload_chunk, mode)
@@ -185,8 +244,8 @@ def receive_loop(mode: str):
                             if payload_dict.get("type") in ["dummy", "dummy_bam"]:
                                 received_message_count += 1
                                 dummy_size = payload_dict.get("size", "N/A")
-                                logger.info(f"--- 메시지 #{received_message_count} (FRAME_SEQ: 0x{frame_seq:02x}) 더미 데이터 수신 성공 ---")
-                                logger.info(f"  Type: {payload_dict.get('type')}, Size: {dummy_size}B")
+                                logger.info("--- 메시지 #%d (FRAME_SEQ: 0x%02x) 더미 데이터 수신 성공 ---", received_message_count, frame_seq)
+                                logger.info("  Type: %s, Size: %sB", payload_dict.get('type'), dummy_size)
                                 log_rx_event(event_type="DECODE_SUCCESS_DUMMY", frame_seq_recv=frame_seq, rssi_dbm=rssi_dbm, notes=f"type: {payload_dict.get('type')}, size: {dummy_size}")
                                 meta = {"recv_frame_seq": frame_seq, "rssi_dbm": rssi_dbm, "type": "dummy", "size": dummy_size}
                                 _log_json({"status": "dummy_received"}, meta)
@@ -194,7 +253,7 @@ def receive_loop(mode: str):
                             # 센서 데이터 처리
                             else:
                                 received_message_count += 1
-                                logger.info(f"--- 메시지 #{received_message_count} (FRAME_SEQ: 0x{frame_seq:02x}) 디코딩 성공 ---")
+                                logger.info("--- 메시지 #%d (FRAME_SEQ: 0x%02x) 디코딩 성공 ---", received_message_count, frame_seq)
                                 
                                 ts_val = payload_dict.get('ts', 0.0)
                                 is_ts_valid = ts_val > 0
@@ -219,14 +278,15 @@ def receive_loop(mode: str):
                                 # JSON 파일 로깅
                                 _log_json(payload_dict, meta)
                         else:
-                            logger.error(f"메시지 (FRAME_SEQ: 0x{frame_seq:02x}): 디코딩 실패.")
+                            logger.error("메시지 (FRAME_SEQ: 0x%02x): 디코딩 실패.", frame_seq)
                             log_rx_event(event_type="DECODE_FAIL", frame_seq_recv=frame_seq, rssi_dbm=rssi_dbm)
                     except Exception as e_decode:
                         logger.error(f"메시지 처리 중 오류 (FRAME_SEQ: 0x{frame_seq:02x}): {e_decode}", exc_info=True)
                         log_rx_event(event_type="DECODE_EXCEPTION", frame_seq_recv=frame_seq, rssi_dbm=rssi_dbm, notes=str(e_decode))
                 else:
-                    logger.warning(f"데이터 프레임 내용 수신 실패: 기대 {content_len}B, 수신 {len(content_bytes)}B.")
+                    logger.warning("데이터 프레임 내용 수신 실패: 기대 %dB, 수신 %dB.", content_len, len(content_bytes))
                     log_rx_event(event_type="DATA_FRAME_INCOMPLETE", data_len_byte_value=content_len)
+                    if window: _send_bitmap_ack(ser, window[0], window[2]); window = None  # 나머지 프레임은 유실로 보고
                 continue
 
     except KeyboardInterrupt:
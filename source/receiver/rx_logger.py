@@ -1,27 +1,53 @@
 # ChirpChirp/source/receiver/rx_logger.py
 # -*- coding: utf-8 -*-
 
+import atexit
 import csv
 import os
 import datetime
 import logging
+import time
 from typing import Optional, Dict, Any
 from pathlib import Path
 
 rx_internal_logger = logging.getLogger(__name__)
 
+# 이벤트마다 datetime.datetime.now / datetime.timezone.utc 속성 체인을 따라가지 않도록 미리 바인딩
+_UTC = datetime.timezone.utc
+_utcnow = datetime.datetime.now
+
 # --- 설정 및 경로 ---
 _RX_LOGGING_INIT_ERROR = False
 rx_log_file_path = ""
+_rx_log_fp = None      # 이벤트마다 open/close 하지 않도록 한 번만 열어 두는 핸들
+_rx_csv_writer = None
+_rx_rollover_at = 0.0  # 다음 로컬 자정(epoch 초). 이 시각이 지나면 새 날짜 파일로 넘어간다
+
+
+def _open_rx_log_file():
+    """오늘 날짜의 수신 로그 파일을 (추가 모드로) 열고, 비어 있으면 헤더를 씁니다."""
+    global rx_log_file_path, _rx_log_fp, _rx_csv_writer, _rx_rollover_at
+    now = datetime.datetime.now()
+    rx_log_file_path = LOG_DIR_ABSOLUTE / f"rx_receiver_log_{now.strftime('%Y-%m-%d')}.csv"
+    # 추가 모드로 한 번만 열고 같은 핸들의 fstat으로 헤더 필요 여부를 판단한다
+    # (exists/stat 두 번의 조회와, 그 사이 다른 프로세스가 파일을 만드는 경쟁 조건이 없다)
+    fp = open(rx_log_file_path, mode='a', newline='', encoding='utf-8')
+    writer = csv.writer(fp)
+    if os.fstat(fp.fileno()).st_size == 0:
+        writer.writerow(RX_CSV_HEADER); fp.flush()
+    old, _rx_log_fp, _rx_csv_writer = _rx_log_fp, fp, writer
+    if old is not None: old.close()
+    _rx_rollover_at = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time()).timestamp()
+
+
+def _close_rx_log_file():
+    if _rx_log_fp is not None: _rx_log_fp.close()
 
 try:
     PROJECT_ROOT_DIR = Path(__file__).resolve().parent.parent.parent
     LOG_DIR_ABSOLUTE = PROJECT_ROOT_DIR / "logs"
     LOG_DIR_ABSOLUTE.mkdir(exist_ok=True)
     
-    current_date_str = datetime.datetime.now().strftime("%Y-%m-%d")
-    rx_log_file_path = LOG_DIR_ABSOLUTE / f"rx_receiver_log_{current_date_str}.csv"
-
     # --- CSV 헤더 정의 ---
     # 1. 기본 이벤트 정보 헤더
     BASE_EVENT_HEADER = [
@@ -53,44 +79,30 @@ try:
         BASE_EVENT_HEADER + RAW_PACKET_HEADER + ACK_RESPONSE_HEADER + 
         DECODE_META_HEADER + DECODED_DATA_FIELDS_HEADER
     )
+    _NO_DECODED_DATA = ("",) * len(DECODED_DATA_FIELDS_HEADER)  # 디코딩 데이터가 없는 행의 빈 칸
 
-    if not rx_log_file_path.is_file() or rx_log_file_path.stat().st_size == 0:
-        with open(rx_log_file_path, mode='w', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow(RX_CSV_HEADER)
+    _open_rx_log_file()
+    atexit.register(_close_rx_log_file)
 
 except (IOError, Exception) as e:
     rx_internal_logger.error(f"수신 CSV 로그 파일 초기화 실패: {e}", exc_info=True)
     _RX_LOGGING_INIT_ERROR = True
 
-def _flatten_decoded_data(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-    """디코딩된 중첩 딕셔너리를 CSV에 기록하기 위해 평탄화합니다."""
-    flat_data = {}
+def _flatten_decoded_data(data: Optional[Dict[str, Any]]) -> tuple:
+    """디코딩된 중첩 딕셔너리를 DECODED_DATA_FIELDS_HEADER 순서의 값으로 평탄화합니다."""
     if not data:
-        return flat_data
-
-    flat_data["decoded_ts"] = data.get("ts", "")
-    
-    accel = data.get("accel", {})
-    flat_data["decoded_accel_ax"] = accel.get("ax", "")
-    flat_data["decoded_accel_ay"] = accel.get("ay", "")
-    flat_data["decoded_accel_az"] = accel.get("az", "")
-
-    gyro = data.get("gyro", {})
-    flat_data["decoded_gyro_gx"] = gyro.get("gx", "")
-    flat_data["decoded_gyro_gy"] = gyro.get("gy", "")
-    flat_data["decoded_gyro_gz"] = gyro.get("gz", "")
-
-    angle = data.get("angle", {})
-    flat_data["decoded_angle_roll"] = angle.get("roll", "")
-    flat_data["decoded_angle_pitch"] = angle.get("pitch", "")
-    flat_data["decoded_angle_yaw"] = angle.get("yaw", "")
-
-    gps = data.get("gps", {})
-    flat_data["decoded_gps_lat"] = gps.get("lat", "")
-    flat_data["decoded_gps_lon"] = gps.get("lon", "")
-    flat_data["decoded_gps_altitude"] = gps.get("altitude", "")
-    
-    return flat_data
+        return _NO_DECODED_DATA
+    accel = data.get("accel") or {}
+    gyro = data.get("gyro") or {}
+    angle = data.get("angle") or {}
+    gps = data.get("gps") or {}
+    return (
+        data.get("ts", ""),
+        accel.get("ax", ""), accel.get("ay", ""), accel.get("az", ""),
+        gyro.get("gx", ""), gyro.get("gy", ""), gyro.get("gz", ""),
+        angle.get("roll", ""), angle.get("pitch", ""), angle.get("yaw", ""),
+        gps.get("lat", ""), gps.get("lon", ""), gps.get("altitude", ""),
+    )
 
 def log_rx_event(
     event_type: str,
@@ -110,37 +122,19 @@ def log_rx_event(
     if _RX_LOGGING_INIT_ERROR:
         return
 
-    # 모든 필드를 빈 문자열로 초기화
-    row_dict = {key: "" for key in RX_CSV_HEADER}
-    
+    row = None
     try:
-        # 1. 기본 정보 업데이트
-        row_dict.update({
-            "log_timestamp_utc": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds") + "Z",
-            "event_type": event_type,
-            "frame_seq_recv": frame_seq_recv,
-            "rssi_dbm": rssi_dbm,
-            "notes": notes
-        })
-
-        # 2. 선택적 정보 업데이트
-        if packet_type_recv_hex is not None: row_dict["packet_type_recv_hex"] = packet_type_recv_hex
-        if data_len_byte_value is not None: row_dict["data_len_byte_value"] = data_len_byte_value
-        if payload_len_on_wire is not None: row_dict["payload_len_on_wire"] = payload_len_on_wire
-        if ack_seq_sent is not None: row_dict["ack_seq_sent"] = ack_seq_sent
-        if ack_type_sent_hex is not None: row_dict["ack_type_sent_hex"] = ack_type_sent_hex
-        if is_decoded_ts_valid is not None: row_dict["is_decoded_ts_valid"] = is_decoded_ts_valid
-        if calculated_latency_ms is not None: row_dict["calculated_latency_ms"] = calculated_latency_ms
-        
-        # 3. 디코딩된 데이터 평탄화 및 업데이트 (DECODE_SUCCESS 이벤트에만 해당)
-        if event_type == "DECODE_SUCCESS" and decoded_payload_dict:
-            flat_data = _flatten_decoded_data(decoded_payload_dict)
-            row_dict.update(flat_data)
-        
-        # 4. 최종적으로 CSV에 기록
-        row_list = [row_dict.get(header, '') for header in RX_CSV_HEADER]
-        with open(rx_log_file_path, mode='a', newline='', encoding='utf-8') as f:
-            csv.writer(f).writerow(row_list)
+        # RX_CSV_HEADER 순서 그대로 바로 만든다 (None은 csv.writer가 빈 칸으로 쓴다)
+        # 열 이름이 붙은 dict는 아래 오류 로그에서만 만든다
+        row = (
+            _utcnow(_UTC).isoformat(timespec="milliseconds") + "Z", event_type, frame_seq_recv, rssi_dbm, notes,
+            packet_type_recv_hex, data_len_byte_value, payload_len_on_wire,
+            ack_seq_sent, ack_type_sent_hex,
+            is_decoded_ts_valid, calculated_latency_ms,
+        ) + (_flatten_decoded_data(decoded_payload_dict) if event_type == "DECODE_SUCCESS" else _NO_DECODED_DATA)
+
+        if time.time() >= _rx_rollover_at: _open_rx_log_file()  # 자정을 넘겨 실행 중이면 새 날짜 파일로
+        _rx_csv_writer.writerow(row); _rx_log_fp.flush()
             
     except (IOError, Exception) as e:
-        rx_internal_logger.error(f"수신 CSV 로그 기록 실패: {e} | 데이터: {row_dict}", exc_info=True)
\ No newline at end of file
+        rx_internal_logger.error("수신 CSV 로그 기록 실패: %s | 데이터: %s", e, dict(zip(RX_CSV_HEADER, row)) if row else event_type, exc_info=True)
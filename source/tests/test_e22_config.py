@@ -0,0 +1,17 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.e22_config import _REG0_TABLE, build_reg0, decode_reg0
+
+
+def test_decode_reg0_parity_0b11_is_8n1():
+    """패리티 비트 0b11은 데이터시트상 8N1 (예전에는 KeyError)"""
+    reg0 = (0b011 << 5) | (0b11 << 3) | 0b010
+    assert decode_reg0(reg0) == (9600, "8N1", "2.4k")
+
+
+def test_build_reg0_round_trip_all_combinations():
+    assert len(_REG0_TABLE) == 192
+    for baud, parity, adr in _REG0_TABLE:
+        assert decode_reg0(build_reg0(baud, parity, adr)) == (baud, parity, adr)
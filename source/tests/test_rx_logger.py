@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from receiver import rx_logger
+from receiver.rx_logger import _flatten_decoded_data
+
+_SAMPLE = {
+    "ts": 1.5,
+    "accel": {"ax": 1, "ay": 2, "az": 3},
+    "gyro": {"gx": 4, "gy": 5, "gz": 6},
+    "angle": {"roll": 7, "pitch": 8, "yaw": 9},
+    "gps": {"lat": 10, "lon": 11, "altitude": 12},
+}
+
+
+def test_flatten_width_matches_header():
+    """헤더에 필드를 추가하고 평탄화를 빠뜨리면 CSV 열이 밀리므로 열 수가 같아야 한다"""
+    assert not rx_logger._RX_LOGGING_INIT_ERROR
+    width = len(rx_logger.DECODED_DATA_FIELDS_HEADER)
+    assert len(_flatten_decoded_data(_SAMPLE)) == width
+    assert len(_flatten_decoded_data({"ts": 0})) == width
+    assert _flatten_decoded_data(None) == rx_logger._NO_DECODED_DATA == ("",) * width
+
+
+def test_flatten_follows_header_order():
+    row = dict(zip(rx_logger.DECODED_DATA_FIELDS_HEADER, _flatten_decoded_data(_SAMPLE)))
+    assert row["decoded_ts"] == 1.5
+    assert row["decoded_accel_az"] == 3
+    assert row["decoded_angle_roll"] == 7
+    assert row["decoded_gps_altitude"] == 12
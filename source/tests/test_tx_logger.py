@@ -0,0 +1,39 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import datetime
+
+from transmitter.tx_logger import _ts_iso
+
+_UTC = datetime.timezone.utc
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=_UTC)
+
+
+def _expected(ns: int) -> str:
+    return (_EPOCH + datetime.timedelta(microseconds=ns // 1000)).isoformat(timespec="milliseconds") + "Z"
+
+
+def test_ts_iso_ns_matches_isoformat_across_day_boundary():
+    """ns 정수 경로가 자정 전후로 datetime.isoformat()과 같은 문자열을 만드는지 확인"""
+    midnight = datetime.datetime(2026, 10, 17, tzinfo=_UTC)
+    midnight_ns = (midnight - _EPOCH) // datetime.timedelta(microseconds=1) * 1000
+    # 자정 2초 전부터 2초 후까지, 밀리초 경계 직전/직후 값을 포함해 훑는다 (날짜 캐시가 양방향으로 바뀜)
+    for offset_ns in list(range(-2_000_000_000, 2_000_000_000, 999_999)) + [-1, 0, 1, -2_000_000_000]:
+        ns = midnight_ns + offset_ns
+        assert _ts_iso(ns) == _expected(ns), ns
+
+
+def test_ts_iso_ns_edge_times():
+    """에포크, 하루의 마지막 밀리초, 윤년 2월 29일"""
+    for dt in (_EPOCH,
+               datetime.datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=_UTC),
+               datetime.datetime(2024, 3, 1, 0, 0, 0, 0, tzinfo=_UTC)):
+        ns = (dt - _EPOCH) // datetime.timedelta(microseconds=1) * 1000
+        assert _ts_iso(ns) == _expected(ns)
+
+
+def test_ts_iso_datetime_and_none():
+    dt = datetime.datetime(2026, 10, 16, 12, 34, 56, 789123, tzinfo=_UTC)
+    assert _ts_iso(dt) == dt.isoformat(timespec="milliseconds") + "Z"
+    assert _ts_iso(None) == ''
@@ -1,11 +1,13 @@
 # e22_config.py
+import os
 import serial
 
 # 변경이 필요한 설정값
 SERIAL_PORT    = '/dev/ttyAMA0'
-BAUD_RATE      = 9600
+BAUD_RATE      = int(os.environ.get("CHIRP_BAUD", "9600"))  # E22 REG0의 UART 속도와 같아야 함 (1200~115200)
 WRITE_TIMEOUT  = 2    # 초
 READ_TIMEOUT   = 1    # 초
+SUB_PACKET_SIZE = 240 # E22 무선 서브 패킷 크기 (REG1 기본값, 바이트)
 
 def init_serial() -> serial.Serial:
 
@@ -25,6 +25,9 @@ logger = logging.getLogger(__name__)
 
 # --- Raw 모드 설정 ---
 _RAW_FMT = "<Ihhhhhhhhhfff" # altitude float 가정 (총 34바이트)
+_RAW_STRUCT = struct.Struct(_RAW_FMT)  # 포맷 문자열을 한 번만 해석
+_RAW_SIZE = _RAW_STRUCT.size
+_SEQ_PREFIX = tuple(bytes((seq,)) for seq in range(256))  # 프레임 앞 SEQ 바이트를 메시지마다 새로 만들지 않음
 _RAW_FIELDS_SCALES = (
     ("ts", 1), ("accel.ax", 1000), ("accel.ay", 1000), ("accel.az", 1000),
     ("gyro.gx", 10), ("gyro.gy", 10), ("gyro.gz", 10),
@@ -94,10 +97,10 @@ def _pack_raw_data(data: Dict[str, Any]) -> bytes:
             if field_path == "ts": values_to_pack.append(int(float(raw_value)))
             elif field_path.startswith("gps."): values_to_pack.append(float(raw_value))
             else: values_to_pack.append(int(float(raw_value) * scale))
-        return struct.pack(_RAW_FMT, *values_to_pack)
+        return _RAW_STRUCT.pack(*values_to_pack)
     except Exception as e:
-        logger.error(f"Raw 데이터 패킹 오류: {e}", exc_info=True)
-        return b'\x00' * struct.calcsize(_RAW_FMT)
+        logger.error("Raw 데이터 패킹 오류: %s", e, exc_info=True)
+        return b'\x00' * _RAW_SIZE
 
 def _encode_bam_data(sample_dict: Dict[str, Any]) -> Optional[bytes]:
     if not MODEL_INITIALIZED or not BAM_AUTOENCODER or not SCALER:
@@ -127,11 +130,11 @@ def _encode_bam_data(sample_dict: Dict[str, Any]) -> Optional[bytes]:
         pack_format = f'<I{len(latent_vector_quantized)}h' 
         payload_bytes = struct.pack(pack_format, ts_val, *latent_vector_quantized)
         
-        logger.info(f"BAM 모드(16b 양자화): 원본(raw) 약 {struct.calcsize(_RAW_FMT)}B -> 압축 {len(payload_bytes)}B (ts포함)")
+        logger.info("BAM 모드(16b 양자화): 원본(raw) 약 %dB -> 압축 %dB (ts포함)", _RAW_SIZE, len(payload_bytes))
         return payload_bytes
 
     except Exception as e:
-        logger.error(f"BAM 인코딩(16b 양자화) 중 오류: {e}", exc_info=True)
+        logger.error("BAM 인코딩(16b 양자화) 중 오류: %s", e, exc_info=True)
         return None
 
 def create_frame(sample: Dict[str, Any], message_seq: int, compression_mode: str, payload_size: int = 0) -> Optional[bytes]:
@@ -143,17 +146,17 @@ def create_frame(sample: Dict[str, Any], message_seq: int, compression_mode: str
         elif compression_mode == "bam":
             payload_chunk = _encode_bam_data(sample)
             if not payload_chunk:
-                logger.warning(f"BAM 인코딩 실패, Raw 모드로 대체 시도. (SEQ: {message_seq})")
+                logger.warning("BAM 인코딩 실패, Raw 모드로 대체 시도. (SEQ: %d)", message_seq)
                 payload_chunk = _pack_raw_data(sample)
                 if not payload_chunk: return None
         else:
-            logger.error(f"알 수 없는 압축 모드: {compression_mode}"); return None
+            logger.error("알 수 없는 압축 모드: %s", compression_mode); return None
     elif payload_size > 0:
         payload_chunk = os.urandom(payload_size)
-    else: logger.error(f"잘못된 payload_size: {payload_size}"); return None
+    else: logger.error("잘못된 payload_size: %s", payload_size); return None
 
-    frame_content = bytes([message_seq % 256]) + payload_chunk
+    frame_content = _SEQ_PREFIX[message_seq % 256] + payload_chunk
     if len(frame_content) > MAX_FRAME_CONTENT_SIZE:
-        logger.warning(f"생성된 프레임({len(frame_content)}B)이 최대 크기({MAX_FRAME_CONTENT_SIZE}B) 초과. 자릅니다.")
+        logger.warning("생성된 프레임(%dB)이 최대 크기(%dB) 초과. 자릅니다.", len(frame_content), MAX_FRAME_CONTENT_SIZE)
         frame_content = frame_content[:MAX_FRAME_CONTENT_SIZE]
     return frame_content
\ No newline at end of file
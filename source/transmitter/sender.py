@@ -1,37 +1,86 @@
 # sender.py
 # -- coding: utf-8 --
 from __future__ import annotations
+import os
+import array
 import time
+import atexit
+import queue
+import random
+import select
 import logging
+import logging.handlers
 import serial
-import struct
-import datetime
+import functools
 import sys
-import binascii
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# --- 콘솔 로깅 ---
+# 콘솔 출력(포맷팅 + stderr 쓰기)은 QueueListener 스레드가 담당하고, 송신 루프는 큐에 넣기만 한다.
+# 다른 모듈보다 먼저 설정해, import 되는 모듈의 basicConfig가 핸들러를 따로 달지 못하고
+# atexit(역순 실행)에서 리스너가 그 모듈들의 종료 처리 로그까지 출력한 뒤 멈추도록 한다.
+# 이미 로깅을 설정한 프로그램에서 import 하면 그 핸들러를 그대로 둔다.
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """레코드를 그대로 큐에 넣어 포맷팅까지 리스너 스레드에서 처리되도록 합니다."""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+if __name__ == "__main__" or not logging.getLogger().handlers:
+    _log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _console_handler = logging.StreamHandler()
+    _console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    _log_listener = logging.handlers.QueueListener(_log_queue, _console_handler, respect_handler_level=True)
+    logging.getLogger().addHandler(_DeferredQueueHandler(_log_queue)); logging.getLogger().setLevel(logging.INFO)
+    _log_listener.start()
+    # send_data마다 멈추지 않는다: 호출 사이에도 로그가 나가야 하고, stop()은 남은 큐를 비운 뒤 스레드를 끝내므로 종료 시 한 번이면 된다
+    atexit.register(_log_listener.stop)
+logger = logging.getLogger(__name__)
 
 try:
-    from .e22_config import init_serial
+    import fcntl
+    import termios
+except ImportError:  # Windows 등 POSIX가 아닌 환경
+    fcntl = termios = None
+
+try:
+    from .e22_config import SUB_PACKET_SIZE, init_serial
     from .encoder import create_frame
-    from .sensor_reader import SensorReader
-    from .tx_logger import log_tx_event, start_new_log_session
+    from .sensor_reader import SensorReader, get_reader
+    from .tx_logger import (
+        EVT_HANDSHAKE_SYN_SENT, EVT_HANDSHAKE_SYN_FAIL, EVT_HANDSHAKE_ACK_OK,
+        EVT_HANDSHAKE_ACK_INVALID, EVT_HANDSHAKE_ACK_TIMEOUT,
+        EVT_DATA_SENT, EVT_DATA_SEND_FAIL, EVT_DATA_ACK_OK, EVT_DATA_ACK_INVALID,
+        EVT_DATA_ACK_TIMEOUT, EVT_DATA_FINAL_FAILURE, EVT_PERMIT_REUSED,
+        EVT_PERMIT_FINAL_FAILURE, EVT_SKIP_INVALID_SAMPLE, EVT_SKIP_FRAME_CREATION_FAIL, EVT_SKIP_DUPLICATE_PAYLOAD, TxEvent,
+        flush_tx_log, log_tx_events_async, start_new_log_session,
+    )
 except ImportError:
     try:
-        from e22_config import init_serial
+        from e22_config import SUB_PACKET_SIZE, init_serial
         from encoder import create_frame
-        from sensor_reader import SensorReader
-        from tx_logger import log_tx_event, start_new_log_session
+        from sensor_reader import SensorReader, get_reader
+        from tx_logger import (
+            EVT_HANDSHAKE_SYN_SENT, EVT_HANDSHAKE_SYN_FAIL, EVT_HANDSHAKE_ACK_OK,
+            EVT_HANDSHAKE_ACK_INVALID, EVT_HANDSHAKE_ACK_TIMEOUT,
+            EVT_DATA_SENT, EVT_DATA_SEND_FAIL, EVT_DATA_ACK_OK, EVT_DATA_ACK_INVALID,
+            EVT_DATA_ACK_TIMEOUT, EVT_DATA_FINAL_FAILURE,
+            EVT_PERMIT_REUSED, EVT_PERMIT_FINAL_FAILURE, EVT_SKIP_INVALID_SAMPLE,
+            EVT_SKIP_FRAME_CREATION_FAIL, EVT_SKIP_DUPLICATE_PAYLOAD, TxEvent, flush_tx_log, log_tx_events_async,
+            start_new_log_session,
+        )
     except ImportError as e:
         print(f"모듈 임포트 실패: {e}. 프로젝트 구조 및 PYTHONPATH를 확인하세요.")
         exit(1)
 
 # --- 설정 (Configuration) ---
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-logger = logging.getLogger(__name__)
-
-
 SEND_COUNT         = 100
 GENERIC_TIMEOUT    = 10
+HANDSHAKE_ACK_TIMEOUT = 1.0     # 첫 SYN의 ACK 대기 (초); 시도마다 두 배로 늘려 GENERIC_TIMEOUT까지
+INTER_BYTE_TIMEOUT = 0.01       # 응답 바이트 사이 최대 간격 상한 (초); 1바이트만 온 응답을 GENERIC_TIMEOUT까지 기다리지 않음
+INTER_BYTE_CHARS   = 5          # 응답 바이트 사이 허용 간격 (UART 문자 시간 단위)
 RETRY_HANDSHAKE    = 10
 RETRY_QUERY_PERMIT = 50
 RETRY_DATA_ACK     = 50
@@ -40,242 +89,692 @@ ACK_TYPE_HANDSHAKE = 0x00
 ACK_TYPE_DATA      = 0xAA
 QUERY_TYPE_SEND_REQUEST = 0x50
 ACK_TYPE_SEND_PERMIT  = 0x55
+QUERY_TYPE_WINDOW_REQUEST = 0x51  # [TYPE, 첫 SEQ, 개수] 뒤에 DATA 프레임들이 같은 무선 패킷으로 이어짐 (PERMIT 없음)
+ACK_TYPE_DATA_BITMAP = 0xAB       # [TYPE, 첫 SEQ, 비트맵]: 비트 i = (첫 SEQ + i) 프레임 수신 여부
+WINDOW_HEADER_LEN  = 3
+BITMAP_ACK_LEN     = 3
+WINDOW_MAX         = 8            # 비트맵 1바이트로 표현할 수 있는 SEQ 범위
 ACK_PACKET_LEN     = 2
+CTRL_PACKET_LEN    = 2          # 송신 제어 패킷: TYPE, SEQ (수신 ACK/PERMIT도 같은 2바이트 형식이라 인덱싱으로 바로 읽음)
+INTER_MESSAGE_DELAY = 0.1        # reliable 모드 메시지 시작 사이 최소 간격 (초, 듀티 사이클 상한); 송수신에 걸린 시간만큼 대기가 줄어든다. PDR 모드는 UART 송신 시간만큼만 간격을 둔다
+PERMIT_REUSE_RTT_FACTOR = 3      # 직전 DATA_ACK 이후 (대기 + RTT×N) 이내면 Query 생략
+COALESCE_QUERY_DATA_PDR = True   # PDR 모드: QUERY와 DATA를 한 번에 써서 Query/Permit 왕복 생략
+COALESCE_QUERY_DATA_RELIABLE = False  # reliable 모드: Permit 재사용이 안 될 때(첫 메시지·실패 직후)도 QUERY와 DATA를 한 번에 씀
+WINDOW_BITMAP_ACK  = False        # batch_size > 1: 프레임별 DATA_ACK 대신 창(window) 단위 비트맵 ACK 사용 (수신기도 지원해야 함)
+ACK_TIMEOUT_MIN    = 0.2         # 적응형 ACK 대기 시간 하한 (초)
+ACK_TIMEOUT_MAX_BACKOFF = 64     # 연속 타임아웃 시 RTO 배수 상한
+RETRY_BACKOFF_BASE = 0.1         # 재시도 전 대기(full jitter)의 기본값 (초)
+RETRY_BACKOFF_CAP  = 2.0         # 재시도 전 대기 상한 (초)
+SENSOR_RING_SIZE   = 8           # 센서 생산자 스레드가 채우는 원형 버퍼 크기 (오래된 샘플부터 밀려남)
+SENSOR_SAMPLE_PERIOD = 0.0       # 센서 샘플 사이 추가 대기 (초); 0이면 읽기가 끝나는 대로 다음 샘플
+
+DEDUP_PAYLOAD = False  # reliable 모드(batch_size 1): 직전에 ACK 된 것과 같은 페이로드면 전송 생략 (수신기가 모든 샘플을 받아야 하면 False)
+
+TX_EVENT_LOG = True  # False면 CSV 이벤트 기록을 통째로 생략 (순수 처리량 측정용, CHIRP_TX_CSV=0)
+
+# 패킷 hex 덤프·구분선 출력 여부; 매 패킷/메시지마다 로거 계층을 확인하지 않도록 send_data 시작 시 한 번만 갱신한다
+_debug_enabled = False
+_info_enabled = True
+# 송신하는 제어 패킷은 QUERY뿐이므로 SEQ별 완성 패킷을 미리 만들어 둔다
+_CTRL_QUERY_TABLE  = tuple(bytes((QUERY_TYPE_SEND_REQUEST, seq)) for seq in range(256))
+_LEN_PREFIX        = tuple(bytes((n,)) for n in range(256))  # 배치용 LEN 바이트
+_CTRL_TYPE_NAMES   = {QUERY_TYPE_SEND_REQUEST: "QUERY_SEND_REQUEST"}
+
 HANDSHAKE_ACK_SEQ  = 0x00
+# 기대하는 응답 바이트를 미리 만들어 두고 수신 바이트와 그대로 비교한다
+_EXPECTED_HANDSHAKE_ACK = bytes((ACK_TYPE_HANDSHAKE, HANDSHAKE_ACK_SEQ))
+_EXPECTED_PERMIT_TABLE  = tuple(bytes((ACK_TYPE_SEND_PERMIT, seq)) for seq in range(256))
+_EXPECTED_DATA_ACK_TABLE = tuple(bytes((ACK_TYPE_DATA, seq)) for seq in range(256))
 
-# --- Helper Functions (변경 없음) ---
-def print_separator(title: str, length: int = 60, char: str = '-') -> None:
-    if len(title) + 2 > length: logger.info(f"-- {title} --")
+# --- Helper Functions ---
+@functools.lru_cache(maxsize=256)
+def _separator_pads(title_len: int, length: int, char: str) -> Tuple[str, str]:
+    pad = (length - title_len - 2) // 2
+    return char * pad, char * (length - title_len - 2 - pad)
+
+def print_separator(title: str, *args: Any, length: int = 60, char: str = '-') -> None:
+    if not _info_enabled: return
+    if args: title = title % args
+    if len(title) + 2 > length: logger.info("-- %s --", title)
     else:
-        pad = (length - len(title) - 2) // 2
-        line = char * pad + f" {title} " + char * pad
-        if len(line) < length: line += char
-        logger.info(line)
+        left, right = _separator_pads(len(title), length, char)
+        logger.info("%s %s %s", left, title, right)
+
+_ASYNC_LOW_LATENCY = 0x2000  # linux/tty_flags.h
+
+def _enable_low_latency(s: serial.Serial) -> None:
+    # Linux 전용: ASYNC_LOW_LATENCY 플래그로 드라이버의 읽기 지연(FTDI 기본 16ms)을 최소화
+    # FTDI/PL2303/CH34x 같은 USB-시리얼 드라이버에서만 효과가 있고, 온보드 UART(ttyAMA 등)는 지원하지 않거나 영향이 없다
+    if not sys.platform.startswith('linux'): return
+    try:
+        if hasattr(s, 'set_low_latency_mode'): s.set_low_latency_mode(True); return
+        # set_low_latency_mode가 없는 pyserial: serial_struct를 직접 읽고 써서 flags(5번째 int)에 플래그를 켠다
+        fd = getattr(s, 'fd', None)
+        if fcntl is None or fd is None or not hasattr(termios, 'TIOCGSERIAL'): return
+        buf = array.array('i', [0] * 32)
+        fcntl.ioctl(fd, termios.TIOCGSERIAL, buf)
+        if not buf[4] & _ASYNC_LOW_LATENCY:
+            buf[4] |= _ASYNC_LOW_LATENCY; fcntl.ioctl(fd, termios.TIOCSSERIAL, buf)
+    except (OSError, ValueError) as e: logger.debug("ASYNC_LOW_LATENCY 미지원 포트: %s", e)
+
+_serial_port: Optional[serial.Serial] = None  # send_data 호출 간에 재사용하는 포트
+
+def _set_port_timeouts(s: serial.Serial, timeout: float, inter_byte_timeout: Optional[float]) -> None:
+    # pyserial은 대입할 때마다 포트를 재설정(tcsetattr)하므로 값이 바뀔 때만 설정
+    if s.timeout != timeout: s.timeout = timeout
+    if s.inter_byte_timeout != inter_byte_timeout: s.inter_byte_timeout = inter_byte_timeout
+
+def _char_time(s: serial.Serial) -> float:
+    """UART 한 문자(8N1, 10비트)를 보내는 데 걸리는 시간(초)."""
+    return 10 / (getattr(s, 'baudrate', None) or 9600)
+
+def _inter_byte_timeout(s: serial.Serial) -> float:
+    # 2바이트 응답은 연속으로 도착하므로 보레이트 기준 몇 문자 시간이면 충분하다 (9600bps에서 약 5ms)
+    return min(INTER_BYTE_TIMEOUT, INTER_BYTE_CHARS * _char_time(s))
 
 def _open_serial() -> serial.Serial:
+    # 핸드셰이크부터 데이터 전송까지 같은 타임아웃을 쓰므로 포트를 열 때 한 번만 설정한다
+    global _serial_port
+    if _serial_port is not None and _serial_port.is_open:
+        _set_port_timeouts(_serial_port, GENERIC_TIMEOUT, _inter_byte_timeout(_serial_port))
+        _ack_reader.discard(_serial_port)  # 이전 세션의 늦은 ACK/비트맵이 이번 핸드셰이크 응답으로 읽히지 않도록
+        return _serial_port
     try:
         s = init_serial()
-        s.timeout = GENERIC_TIMEOUT; s.inter_byte_timeout = None; time.sleep(0.1)
+        _enable_low_latency(s)
+        _set_port_timeouts(s, GENERIC_TIMEOUT, _inter_byte_timeout(s)); time.sleep(0.1)
+        _serial_port = s; _ack_reader.reset()
         return s
     except serial.SerialException as e:
-        logger.error(f"시리얼 포트 열기 실패: {e}"); raise
+        logger.error("시리얼 포트 열기 실패: %s", e); raise
+
+def shutdown() -> None:
+    """재사용 중인 시리얼 포트를 닫습니다. 다음 send_data 호출 시 다시 엽니다."""
+    global _serial_port
+    s, _serial_port = _serial_port, None
+    if s is None or not s.is_open: return
+    # 데이터 경로는 drain하지 않으므로 닫기 전에 한 번만 마지막 프레임이 UART로 다 나가도록 기다린다
+    try: s.flush()
+    except Exception as e: logger.debug("닫기 전 drain 실패: %s", e)
+    s.close()
+
+atexit.register(shutdown)
 
 def bytes_to_hex_pretty_str(data_bytes: bytes, bytes_per_line: int = 16) -> str:
     if not data_bytes: return "<empty>"
-    hex_str = binascii.hexlify(data_bytes).decode('ascii')
-    lines: List[str] = [f"  {' '.join(hex_str[i:i+2] for i in range(0, len(line), 2))}" for line in [hex_str[j:j+bytes_per_line*2] for j in range(0, len(hex_str), bytes_per_line*2)]]
-    return "\n".join(lines)
+    h, step = data_bytes.hex(' '), bytes_per_line * 3  # 한 번의 C 호출로 "aa bb cc ..." 생성 후 줄 단위로 자름
+    return "\n".join(f"  {h[i:i+step-1]}" for i in range(0, len(h), step))
+
+def _write_vectored(s: serial.Serial, parts: Tuple[bytes, ...], total: int) -> int:
+    """여러 버퍼를 writev 한 번으로(버퍼가 하나면 write로) fd에 직접 씁니다.
 
-def _tx_data_packet(s: serial.Serial, buf: bytes) -> Tuple[bool, Optional[datetime.datetime]]:
-    ts_sent = datetime.datetime.now(datetime.timezone.utc)
+    UART drain(tcdrain)은 기다리지 않는다. 전송 뒤에는 항상 ACK 대기가 이어지므로
+    송신 완료는 응답 수신으로 확인된다.
+    """
+    fd = getattr(s, 'fd', None)
+    if termios is None or not hasattr(os, 'writev') or fd is None:
+        return s.write(b''.join(parts))
+    try: written = os.write(fd, parts[0]) if len(parts) == 1 else os.writev(fd, parts)
+    except BlockingIOError: written = 0  # pyserial은 fd를 O_NONBLOCK으로 연다
+    if written < total: written += s.write(b''.join(parts)[written:])
+    return written
+
+def _pace(interval: float, since: float) -> None:
+    """since(monotonic)부터 interval이 지날 때까지 남은 시간만 잠듭니다."""
+    remaining = interval - (time.monotonic() - since)
+    if remaining > 0: time.sleep(remaining)
+
+def _uart_tx_remaining(s: serial.Serial, nbytes: int, since_ns: int) -> float:
+    """since_ns(monotonic)에 쓴 nbytes가 UART로 모두 나가기까지 남은 시간(초)."""
+    airtime = nbytes * _char_time(s)
+    return max(0.0, airtime - (time.monotonic_ns() - since_ns) / 1e9)
+
+class _AckReader:
+    """ACK 수신용 고정 버퍼 리더.
+
+    poll()(없으면 select())로 fd 준비를 기다린 뒤 도착해 있는 만큼(최대 버퍼 크기) 한 번에 읽어 두고 n바이트씩 꺼내 준다.
+    PERMIT+DATA_ACK나 배치 ACK처럼 연달아 도착한 응답은 추가 시스템 호출 없이 버퍼에서 바로 나간다.
+    """
+    def __init__(self, size: int = 64) -> None:
+        self._buf = bytearray(size); self._mv = memoryview(self._buf)
+        self._head = self._tail = 0
+        self._poller: Any = None; self._poll_fd = -1  # fd당 한 번만 등록해 두고 재사용
+
+    def reset(self) -> None:
+        """버퍼에 남은 바이트를 버립니다 (포트를 새로 열 때)."""
+        self._head = self._tail = 0
+        self._poller = None; self._poll_fd = -1
+
+    def discard(self, s: serial.Serial) -> None:
+        """버퍼와 OS 수신 큐(TCIFLUSH)에 남은 응답 바이트를 버립니다.
+
+        타임아웃 뒤에 늦게 도착한 ACK가 다음 시도의 응답으로 읽혀 불필요한 재전송이 이어지지 않도록 재시도 직전에 호출합니다.
+        """
+        self._head = self._tail = 0
+        try: s.reset_input_buffer()
+        except Exception as e: logger.debug("수신 버퍼 비우기 실패: %s", e)
+
+    def _wait_readable(self, fd: int, timeout: float) -> bool:
+        if not hasattr(select, 'poll'): return bool(select.select([fd], [], [], timeout)[0])
+        if self._poll_fd != fd:
+            self._poller = select.poll(); self._poller.register(fd, select.POLLIN); self._poll_fd = fd
+        return bool(self._poller.poll(max(0, int(timeout * 1000 + 0.999))))  # 밀리초 단위, 올림
+
+    def read_into(self, s: serial.Serial, n: int, timeout: float) -> memoryview:
+        """n바이트(또는 timeout까지 받은 만큼)를 반환합니다.
+
+        반환값은 내부 버퍼의 뷰이므로 다음 read_into 호출 전에 해석해야 합니다.
+        """
+        if self._head and self._tail - self._head < n:  # 남은 조각을 앞으로 당겨 뒤쪽 공간 확보
+            avail = self._tail - self._head
+            self._buf[:avail] = self._mv[self._head:self._tail]; self._head, self._tail = 0, avail
+        mv = self._mv
+        fd = getattr(s, 'fd', None)
+        if termios is None or fd is None:
+            if self._tail - self._head < n:
+                if s.timeout != timeout: s.timeout = timeout
+                self._tail += s.readinto(mv[self._tail:self._head + n]) or 0
+        else:
+            deadline = time.monotonic() + timeout
+            inter_byte = s.inter_byte_timeout
+            while self._tail - self._head < n:
+                remaining = deadline - time.monotonic()
+                if inter_byte and self._tail > self._head: remaining = min(remaining, inter_byte)  # 응답 일부만 온 경우
+                if remaining <= 0: break
+                if not self._wait_readable(fd, remaining): break
+                try: k = os.readv(fd, [mv[self._tail:]])
+                except BlockingIOError: continue
+                if not k: raise serial.SerialException("device reports readiness to read but returned no data")
+                self._tail += k
+        got = min(n, self._tail - self._head)
+        out = mv[self._head:self._head + got]; self._head += got
+        if self._head == self._tail: self._head = self._tail = 0
+        return out
+
+_ack_reader = _AckReader()
+
+def _tx_data_packet(s: serial.Serial, *parts: bytes) -> Tuple[bool, int]:
+    ts_sent = time.time_ns()
     try:
-        written = s.write(buf); s.flush()
-        if logger.isEnabledFor(logging.DEBUG): logger.debug(f"DATA PKT TX ({len(buf)}B):\n{bytes_to_hex_pretty_str(buf)}")
-        else: logger.info(f"DATA PKT TX ({len(buf)}B)")
-        return written == len(buf), ts_sent
+        total = sum(len(p) for p in parts)
+        written = _write_vectored(s, parts, total)
+        if _debug_enabled: logger.debug("DATA PKT TX (%dB):\n%s", total, bytes_to_hex_pretty_str(b''.join(parts)))
+        else: logger.info("DATA PKT TX (%dB)", total)
+        return written == total, ts_sent
     except Exception as e:
-        logger.error(f"DATA PKT TX 실패: {e}"); return False, ts_sent
+        logger.error("DATA PKT TX 실패: %s", e); return False, ts_sent
 
-def _tx_control_packet(s: serial.Serial, seq: int, packet_type: int) -> bool:
-    pkt_bytes = struct.pack("!BB", packet_type, seq)
+def _tx_control_packet(s: serial.Serial, seq: int, packet_type: int, pkt_bytes: Optional[bytes] = None) -> bool:
+    # 재시도 루프에서는 호출 측이 미리 만든 pkt_bytes를 넘긴다
+    if pkt_bytes is None: pkt_bytes = _CTRL_QUERY_TABLE[seq] if packet_type == QUERY_TYPE_SEND_REQUEST else bytes((packet_type, seq))
     try:
-        written = s.write(pkt_bytes); s.flush()
-        type_name = {QUERY_TYPE_SEND_REQUEST: "QUERY_SEND_REQUEST"}.get(packet_type, f"UNKNOWN_0x{packet_type:02x}")
-        if logger.isEnabledFor(logging.DEBUG): logger.debug(f"CTRL PKT TX ({len(pkt_bytes)}B): TYPE={type_name}, SEQ={seq}\n{bytes_to_hex_pretty_str(pkt_bytes)}")
-        else: logger.info(f"CTRL PKT TX: TYPE={type_name}, SEQ={seq}")
+        written = _write_vectored(s, (pkt_bytes,), len(pkt_bytes))  # pyserial write() 래퍼를 거치지 않음
+        type_name = _CTRL_TYPE_NAMES.get(packet_type) or f"UNKNOWN_0x{packet_type:02x}"
+        if _debug_enabled: logger.debug("CTRL PKT TX (%dB): TYPE=%s, SEQ=%d\n%s", len(pkt_bytes), type_name, seq, bytes_to_hex_pretty_str(pkt_bytes))
+        else: logger.info("CTRL PKT TX: TYPE=%s, SEQ=%d", type_name, seq)
         return written == len(pkt_bytes)
     except Exception as e:
-        logger.error(f"CTRL PKT TX 실패 (TYPE=0x{packet_type:02x}, SEQ={seq}): {e}"); return False
+        logger.error("CTRL PKT TX 실패 (TYPE=0x%02x, SEQ=%d): %s", packet_type, seq, e); return False
+
+_rng = random.SystemRandom()
+
+def _backoff(attempt: int, base: float = RETRY_BACKOFF_BASE, cap: float = RETRY_BACKOFF_CAP) -> float:
+    """full-jitter 지수 백오프: [0, min(cap, base·2^attempt)) 구간의 임의 대기 시간(초).
+
+    같은 채널을 쓰는 여러 송신기의 재시도가 같은 박자로 겹치지 않게 한다.
+    """
+    return _rng.uniform(0, min(cap, base * (1 << min(attempt, 16))))
+
+class _RtoEstimator:
+    """RFC 6298(Jacobson/Karn) 방식으로 측정 RTT에서 ACK 대기 시간(RTO)을 계산합니다."""
+    def __init__(self) -> None:
+        self.srtt_ns: Optional[int] = None
+        self.rttvar_ns = 0
+        self.backoff = 1
+
+    def sample(self, rtt_ns: int) -> None:
+        if self.srtt_ns is None: self.srtt_ns, self.rttvar_ns = rtt_ns, rtt_ns // 2
+        else:
+            self.rttvar_ns = (3 * self.rttvar_ns + abs(self.srtt_ns - rtt_ns)) // 4
+            self.srtt_ns = (7 * self.srtt_ns + rtt_ns) // 8
+        self.backoff = 1
+
+    def on_timeout(self) -> None:
+        self.backoff = min(self.backoff * 2, ACK_TIMEOUT_MAX_BACKOFF)
+
+    def timeout(self) -> float:
+        """측정값이 없으면 GENERIC_TIMEOUT, 있으면 [ACK_TIMEOUT_MIN, GENERIC_TIMEOUT] 범위의 RTO (초)."""
+        if self.srtt_ns is None: return GENERIC_TIMEOUT
+        rto = (self.srtt_ns + 4 * self.rttvar_ns) * self.backoff / 1e9
+        return max(ACK_TIMEOUT_MIN, min(GENERIC_TIMEOUT, rto))
+
+def _request_permit(s: serial.Serial, seq: int, max_attempts: int, rto: _RtoEstimator) -> Tuple[bool, int]:
+    """QUERY를 보내고 SEND_PERMIT을 기다립니다. (허가 여부, 시도 횟수)를 반환합니다."""
+    attempts, query_pkt, expected = 0, _CTRL_QUERY_TABLE[seq], _EXPECTED_PERMIT_TABLE[seq]  # 시도마다 같은 패킷
+    while attempts < max_attempts:
+        attempts += 1
+        if attempts > 1: _ack_reader.discard(s)  # 직전 시도의 늦은 응답이 이번 PERMIT으로 읽히지 않도록
+        tx_start_ns = time.monotonic_ns()
+        if not _tx_control_packet(s, seq, QUERY_TYPE_SEND_REQUEST, query_pkt):
+            if attempts < max_attempts: time.sleep(_backoff(attempts)); continue
+            else: break
+        permit_ack_bytes = _ack_reader.read_into(s, ACK_PACKET_LEN, rto.timeout())
+        if permit_ack_bytes == expected:
+            if attempts == 1: rto.sample(time.monotonic_ns() - tx_start_ns)  # Karn: 재전송 후의 응답은 표본에서 제외
+            return True, attempts
+        # 별도 sleep 없이 곧바로 재시도: 대기(backoff)는 다음 read의 타임아웃(RTO×배수)이 담당하므로
+        # 늦게 도착한 응답도 그 구간 안에서 바로 처리된다
+        if not permit_ack_bytes: rto.on_timeout()
+    return False, attempts
+
+# CSV 이벤트는 메시지 단위로 모아 tx_logger의 기록 스레드에 넘긴다 (기록 시각은 이벤트 발생 시점의 time_ns, 문자열 변환은 기록 스레드에서)
+# 이벤트는 kwargs dict 대신 TxEvent 튜플(유형은 EVT_* 정수 ID)로 쌓는다
+_pending_tx_events: List[TxEvent] = []
+
+def _queue_tx_event(frame_seq: int, attempt_num: int, event_id: int, ts_sent: Optional[int] = None, ts_ack_interaction_end: Optional[int] = None,
+                    total_attempts_final: Optional[int] = None, ack_received_final: Optional[bool] = None, payload: Optional[bytes] = None) -> None:
+    if not TX_EVENT_LOG: return
+    _pending_tx_events.append((frame_seq, attempt_num, event_id, ts_sent, ts_ack_interaction_end, total_attempts_final, ack_received_final, payload, time.time_ns()))
+
+def _flush_tx_events() -> None:
+    if not _pending_tx_events: return
+    log_tx_events_async(_pending_tx_events)
+    _pending_tx_events.clear()
 
 # --- ★★★★★ 핸드셰이크 로깅 수정 ★★★★★ ---
-def _handshake(s: serial.Serial) -> bool:
+def _handshake(s: serial.Serial, rto: _RtoEstimator) -> bool:
     print_separator("핸드셰이크 시작")
-    s.timeout = GENERIC_TIMEOUT
+    read_ack = _ack_reader.read_into
     for attempt in range(1, RETRY_HANDSHAKE + 1):
-        logger.info(f"[핸드셰이크] SYN 전송 ({attempt}/{RETRY_HANDSHAKE})")
+        logger.info("[핸드셰이크] SYN 전송 (%d/%d)", attempt, RETRY_HANDSHAKE)
+        tx_start_ns = time.monotonic_ns()
         sent_ok, ts_syn_sent = _tx_data_packet(s, SYN_MSG)
-        log_tx_event(frame_seq=HANDSHAKE_ACK_SEQ, attempt_num=attempt, event_type='HANDSHAKE_SYN_SENT' if sent_ok else 'HANDSHAKE_SYN_FAIL', ts_sent=ts_syn_sent, payload=SYN_MSG)
+        if sent_ok and attempt == 1: s.flush()  # ACK 타이머 시작 전에 SYN이 실제로 송출되도록 세션당 한 번만(첫 수신 전) drain
+        _queue_tx_event(HANDSHAKE_ACK_SEQ, attempt, EVT_HANDSHAKE_SYN_SENT if sent_ok else EVT_HANDSHAKE_SYN_FAIL, ts_syn_sent, None, None, None, SYN_MSG)
         if not sent_ok:
-            if attempt < RETRY_HANDSHAKE: time.sleep(1)
+            if attempt < RETRY_HANDSHAKE: time.sleep(_backoff(attempt))
             continue
         
-        logger.info(f"[핸드셰이크] ACK 대기 중 (Timeout: {s.timeout}s)...")
-        ack_bytes = s.read(ACK_PACKET_LEN)
-        ts_ack_interaction_end = datetime.datetime.now(datetime.timezone.utc)
+        # 수신기는 SYN에 바로 응답하므로 짧게 시작해 유실 시 빨리 재전송하고, 느린 링크를 위해 시도마다 대기를 두 배로 늘린다
+        ack_timeout = min(GENERIC_TIMEOUT, HANDSHAKE_ACK_TIMEOUT * 2 ** (attempt - 1))
+        logger.info("[핸드셰이크] ACK 대기 중 (Timeout: %ss)...", ack_timeout)
+        ack_bytes = read_ack(s, ACK_PACKET_LEN, ack_timeout)
+        ts_ack_interaction_end = time.time_ns()
         if len(ack_bytes) == ACK_PACKET_LEN:
-            try:
-                atype, seq = struct.unpack("!BB", ack_bytes)
-                if atype == ACK_TYPE_HANDSHAKE and seq == HANDSHAKE_ACK_SEQ:
-                    logger.info("[핸드셰이크] 성공"); print_separator("핸드셰이크 완료")
-                    log_tx_event(frame_seq=HANDSHAKE_ACK_SEQ, attempt_num=attempt, event_type='HANDSHAKE_ACK_OK', ts_sent=ts_syn_sent, ts_ack_interaction_end=ts_ack_interaction_end, total_attempts_final=attempt, ack_received_final=True, payload=SYN_MSG)
-                    return True
-                else:
-                    log_tx_event(frame_seq=HANDSHAKE_ACK_SEQ, attempt_num=attempt, event_type='HANDSHAKE_ACK_INVALID', ts_sent=ts_syn_sent, ts_ack_interaction_end=ts_ack_interaction_end, payload=SYN_MSG)
-            except struct.error:
-                log_tx_event(frame_seq=HANDSHAKE_ACK_SEQ, attempt_num=attempt, event_type='HANDSHAKE_ACK_UNPACK_FAIL', ts_sent=ts_syn_sent, ts_ack_interaction_end=ts_ack_interaction_end, payload=SYN_MSG)
+            if ack_bytes == _EXPECTED_HANDSHAKE_ACK:
+                rto.sample(time.monotonic_ns() - tx_start_ns)  # 제어 패킷 RTO의 초기값
+                logger.info("[핸드셰이크] 성공"); print_separator("핸드셰이크 완료")
+                _queue_tx_event(HANDSHAKE_ACK_SEQ, attempt, EVT_HANDSHAKE_ACK_OK, ts_syn_sent, ts_ack_interaction_end, attempt, True, SYN_MSG)
+                return True
+            else:
+                _queue_tx_event(HANDSHAKE_ACK_SEQ, attempt, EVT_HANDSHAKE_ACK_INVALID, ts_syn_sent, ts_ack_interaction_end, None, None, SYN_MSG)
         else:
-            log_tx_event(frame_seq=HANDSHAKE_ACK_SEQ, attempt_num=attempt, event_type='HANDSHAKE_ACK_TIMEOUT', ts_sent=ts_syn_sent, ts_ack_interaction_end=ts_ack_interaction_end, payload=SYN_MSG)
+            _queue_tx_event(HANDSHAKE_ACK_SEQ, attempt, EVT_HANDSHAKE_ACK_TIMEOUT, ts_syn_sent, ts_ack_interaction_end, None, None, SYN_MSG)
         
-        if attempt < RETRY_HANDSHAKE: time.sleep(1)
+        if attempt < RETRY_HANDSHAKE: time.sleep(_backoff(attempt))
 
     logger.error("[핸드셰이크] 최종 실패"); print_separator("핸드셰이크 실패")
     return False
 
+def _send_batch(s: serial.Serial, batch: List[Tuple[int, int, bytes]], rto: _RtoEstimator, max_attempts: int = 1) -> int:
+    """(msg_idx, seq, LEN+frame 패킷) 묶음을 한 번에 쓰고 DATA_ACK들을 모읍니다.
+
+    max_attempts > 1 이면 ACK를 받지 못한 프레임들만 다시 한 번에 묶어 재전송합니다 (선택적 재전송).
+    최종적으로 ACK 된 프레임 수를 반환합니다.
+    """
+    pending = {seq: (msg_idx, raw) for msg_idx, seq, raw in batch}  # 삽입 순서(=SEQ 순서) 유지
+    acked, attempt, ts_sent = 0, 0, None
+    read_ack, now_ns = _ack_reader.read_into, time.time_ns  # ACK 수집 루프에서 반복 조회하지 않도록 지역 이름으로 바인딩
+    while pending and attempt < max_attempts:
+        attempt += 1
+        tx_start_ns = time.monotonic_ns()
+        sent_ok, ts_sent = _tx_data_packet(s, *(raw for _, raw in pending.values()))
+        for seq, (_, raw) in pending.items():
+            _queue_tx_event(seq, attempt, EVT_DATA_SENT if sent_ok else EVT_DATA_SEND_FAIL, ts_sent, None, None, None, raw)
+        if not sent_ok:
+            if attempt < max_attempts: time.sleep(_backoff(attempt))
+            continue
+
+        round_acked, ack_timeout = 0, rto.timeout()
+        for _ in range(2 * len(pending)):  # 엉뚱한 응답이 계속 들어와도 무한 대기하지 않도록 읽기 횟수 제한
+            if not pending: break
+            ack_bytes = read_ack(s, ACK_PACKET_LEN, ack_timeout)
+            if len(ack_bytes) < ACK_PACKET_LEN:
+                if not ack_bytes and not round_acked: rto.on_timeout()
+                break
+            ack_type, ack_seq = ack_bytes[0], ack_bytes[1]
+            if ack_type != ACK_TYPE_DATA or ack_seq not in pending: continue
+            if not round_acked and attempt == 1: rto.sample(time.monotonic_ns() - tx_start_ns)  # 첫 전송의 첫 ACK까지가 RTT 표본 (Karn)
+            _, raw = pending.pop(ack_seq); acked += 1; round_acked += 1
+            _queue_tx_event(ack_seq, attempt, EVT_DATA_ACK_OK, ts_sent, now_ns(), attempt, True, raw)
+        ts_end = time.time_ns()
+        for seq, (_, raw) in pending.items(): _queue_tx_event(seq, attempt, EVT_DATA_ACK_TIMEOUT, ts_sent, ts_end, None, None, raw)
+    logger.info("[배치] %d개 프레임 중 %d개 DATA_ACK 수신 (%d회 전송)", len(batch), acked, attempt)
+
+    for seq, (msg_idx, raw) in pending.items():
+        logger.error("[메시지 %d] 최종 데이터 ACK 미수신. 메시지 실패 처리.", msg_idx)
+        _queue_tx_event(seq, attempt, EVT_DATA_FINAL_FAILURE, ts_sent, time.time_ns(), attempt, False, raw)
+    return acked
+
+def _read_bitmap_ack(s: serial.Serial, first_seq: int, timeout: float) -> Optional[int]:
+    """first_seq 창에 대한 비트맵 ACK를 기다립니다. 타임아웃이면 None을 반환합니다.
+
+    그 사이 도착한 2바이트 응답(늦은 DATA_ACK/PERMIT 등)이나 다른 창의 비트맵은 건너뜁니다.
+    """
+    deadline, read_ack, rest_timeout = time.monotonic() + timeout, _ack_reader.read_into, _inter_byte_timeout(s)
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0: return None
+        head = read_ack(s, 1, remaining)
+        if not head: return None
+        resp_type = head[0]
+        if resp_type == ACK_TYPE_DATA_BITMAP:
+            body = read_ack(s, BITMAP_ACK_LEN - 1, max(remaining, rest_timeout))
+            if len(body) == BITMAP_ACK_LEN - 1 and body[0] == first_seq: return body[1]
+        elif resp_type in (ACK_TYPE_DATA, ACK_TYPE_SEND_PERMIT, ACK_TYPE_HANDSHAKE):
+            read_ack(s, ACK_PACKET_LEN - 1, max(remaining, rest_timeout))
+        # 그 밖의 바이트는 동기가 어긋난 것이므로 한 바이트씩 버리며 다음 응답 시작을 찾는다
+
+def _send_window(s: serial.Serial, batch: List[Tuple[int, int, bytes]], rto: _RtoEstimator, max_attempts: int = 1) -> int:
+    """(msg_idx, seq, LEN+frame 패킷) 묶음을 창 요청 헤더와 함께 한 번에 쓰고 비트맵 ACK 하나로 확인합니다.
+
+    비트맵에서 빠진 프레임만 새 창으로 묶어 max_attempts까지 재전송합니다. 최종적으로 ACK 된 프레임 수를 반환합니다.
+    """
+    pending, acked, attempt, ts_sent = list(batch), 0, 0, None
+    while pending and attempt < max_attempts:
+        attempt += 1
+        first_seq = pending[0][1]
+        header = bytes((QUERY_TYPE_WINDOW_REQUEST, first_seq, (pending[-1][1] - first_seq) % 256 + 1))
+        tx_start_ns = time.monotonic_ns()
+        sent_ok, ts_sent = _tx_data_packet(s, header, *(raw for _, _, raw in pending))
+        for _, seq, raw in pending:
+            _queue_tx_event(seq, attempt, EVT_DATA_SENT if sent_ok else EVT_DATA_SEND_FAIL, ts_sent, None, None, None, raw)
+        if not sent_ok:
+            if attempt < max_attempts: time.sleep(_backoff(attempt))
+            continue
+        bitmap = _read_bitmap_ack(s, first_seq, rto.timeout())
+        ts_end = time.time_ns()
+        if bitmap is None:
+            rto.on_timeout()
+            for _, seq, raw in pending: _queue_tx_event(seq, attempt, EVT_DATA_ACK_TIMEOUT, ts_sent, ts_end, None, None, raw)
+            continue
+        if attempt == 1: rto.sample(time.monotonic_ns() - tx_start_ns)  # Karn: 재전송 창의 응답은 표본에서 제외
+        missing = []
+        for entry in pending:
+            _, seq, raw = entry
+            if bitmap >> ((seq - first_seq) % 256) & 1:
+                acked += 1; _queue_tx_event(seq, attempt, EVT_DATA_ACK_OK, ts_sent, ts_end, attempt, True, raw)
+            else:
+                missing.append(entry); _queue_tx_event(seq, attempt, EVT_DATA_ACK_TIMEOUT, ts_sent, ts_end, None, None, raw)
+        pending = missing
+    logger.info("[창] %d개 프레임 중 %d개 비트맵 ACK 수신 (%d회 전송)", len(batch), acked, attempt)
+
+    for msg_idx, seq, raw in pending:
+        logger.error("[메시지 %d] 최종 데이터 ACK 미수신. 메시지 실패 처리.", msg_idx)
+        _queue_tx_event(seq, attempt, EVT_DATA_FINAL_FAILURE, ts_sent, time.time_ns(), attempt, False, raw)
+    return acked
+
+def _sensor_producer(sr: SensorReader, ring: Deque[Dict[str, Any]], ready: threading.Event, stop: threading.Event) -> None:
+    """stop이 설정될 때까지 센서 샘플을 읽어 ring에 넣습니다. 송신 루프는 가장 최근 샘플을 가져다 씁니다."""
+    while not stop.is_set():
+        try: sample = sr.get_sensor_data()
+        except Exception as e:
+            logger.error("센서 데이터 읽기 실패: %s", e); stop.wait(RETRY_BACKOFF_BASE); continue
+        if sample: ring.append(sample); ready.set()
+        if SENSOR_SAMPLE_PERIOD: stop.wait(SENSOR_SAMPLE_PERIOD)
+
 # --- ★★★★★ 데이터 전송 로깅 수정 ★★★★★ ---
-def send_data(n: int, mode: str, compression_mode: str, payload_size: int) -> int:
-    logger.info("새로운 전송 세션을 시작하며, 로그 파일을 생성합니다."); start_new_log_session()
+def send_data(n: int, mode: str, compression_mode: str, payload_size: int, batch_size: int = 1) -> int:
+    """n개의 메시지를 전송합니다.
+
+    batch_size > 1 이면 최대 batch_size개 프레임을 SUB_PACKET_SIZE 이내로 묶어 Query 없이 한 번에 쓰고
+    DATA_ACK들을 모아서 확인합니다. reliable 모드에서는 ACK가 빠진 프레임들만 다시 묶어 재전송합니다.
+    WINDOW_BITMAP_ACK이면 배치를 창 요청 헤더와 함께 보내고 비트맵 ACK 하나로 확인합니다 (최대 WINDOW_MAX개 SEQ).
+    PDR 모드는 ACK 대기 자체가 페이싱 역할을 하므로 메시지 사이에 고정 대기를 두지 않고,
+    방금 쓴 패킷이 UART로 다 나갈 시간만 보장합니다. reliable 모드는 메시지 시작 사이 간격이
+    INTER_MESSAGE_DELAY 이상이 되도록 남은 시간만 대기합니다.
+    """
+    global _debug_enabled, _info_enabled
+    _debug_enabled, _info_enabled = logger.isEnabledFor(logging.DEBUG), logger.isEnabledFor(logging.INFO)
+    if TX_EVENT_LOG: logger.info("새로운 전송 세션을 시작하며, 로그 파일을 생성합니다."); start_new_log_session()
     
     try: s = _open_serial()
     except Exception: return -1
     
-    if not _handshake(s): s.close(); return 0
-
-    s.timeout = GENERIC_TIMEOUT; s.inter_byte_timeout = 0.1
+    # 제어(QUERY/PERMIT)와 DATA는 패킷 길이(=전파 시간)가 달라 RTT를 따로 추정한다
+    ctrl_rto, data_rto = _RtoEstimator(), _RtoEstimator()
+    handshake_ok = _handshake(s, ctrl_rto); _flush_tx_events()
+    if not handshake_ok: shutdown(); return 0
+    _ack_reader.discard(s)  # 앞서 재전송한 SYN에 대한 중복 핸드셰이크 ACK 제거
 
     if mode == "PDR": effective_retry_query_permit, effective_retry_data_ack = 1, 1; logger.info("PDR 측정 모드. 재전송 비활성화.")
     elif mode == "reliable": effective_retry_query_permit, effective_retry_data_ack = RETRY_QUERY_PERMIT, RETRY_DATA_ACK; logger.info("신뢰성 전송 모드. 재전송 활성화.")
-    else: logger.error(f"알 수 없는 모드: {mode}. 'reliable' 또는 'PDR' 사용."); s.close(); return -2
+    else: logger.error("알 수 없는 모드: %s. 'reliable' 또는 'PDR' 사용.", mode); return -2
+    if batch_size < 1: logger.error("잘못된 batch_size: %d", batch_size); return -2
+    message_gap = INTER_MESSAGE_DELAY if mode == "reliable" and batch_size == 1 else 0
+    tx_batch: List[Tuple[int, int, bytes]] = []; tx_batch_bytes = 0
+    dedup = DEDUP_PAYLOAD and mode == "reliable" and batch_size == 1 and payload_size == 0  # 더미 템플릿은 매번 같은 내용이라 제외
+    last_acked_payload: Optional[bytes] = None; payload: Optional[bytes] = None
+    windowed = batch_size > 1 and WINDOW_BITMAP_ACK
+    send_batch = _send_window if windowed else _send_batch
+    batch_overhead = WINDOW_HEADER_LEN if windowed else 0
+    # [QUERY, SEQ, LEN, frame...] 송신 버퍼를 한 번만 잡아 두고 메시지마다 덮어쓴다 (LEN이 1바이트라 프레임은 최대 255B)
+    tx_buf = bytearray(CTRL_PACKET_LEN + 1 + 255); tx_buf[0] = QUERY_TYPE_SEND_REQUEST
+    tx_view = memoryview(tx_buf)
+    # 재시도 루프용 지역 바인딩
+    read_ack, tx_data, queue_evt = _ack_reader.read_into, _tx_data_packet, _queue_tx_event
+    mono_ns, wall_ns = time.monotonic_ns, time.time_ns
 
     sr = None
     if payload_size == 0:
-        try: sr = SensorReader()
-        except Exception as e: logger.critical(f"SensorReader 초기화 실패: {e}"); s.close(); return -3
+        try: sr = get_reader()  # 호출 간에 같은 인스턴스를 재사용
+        except Exception as e: logger.critical("SensorReader 초기화 실패: %s", e); return -3
 
     reliable_ok_count, pdr_data_acks_received_count, pdr_messages_tx_initiated_count, current_message_seq_counter = 0, 0, 0, 0
+    batch_acked = 0  # batch_size > 1 일 때 _send_batch/_send_window가 확인한 ACK 수
+    last_data_ack_ns, permit_valid_ns = 0, 0
     
     payload_log_str = "Sensor Data" if payload_size == 0 else f"Dummy Data ({payload_size}B)"
-    logger.info(f"사용될 인코딩 모드: '{compression_mode}', 페이로드: '{payload_log_str}'")
-    print_separator(f"총 {n}회 데이터 전송 시작 (모드: {mode})")
+    logger.info("사용될 인코딩 모드: '%s', 페이로드: '%s'", compression_mode, payload_log_str)
+    print_separator("총 %d회 데이터 전송 시작 (모드: %s)", n, mode)
 
-    for msg_idx in range(1, n + 1):
-        print_separator(f"메시지 {msg_idx}/{n} (Message SEQ: {current_message_seq_counter}) 시작")
+    # 센서는 생산자 스레드가 원형 버퍼(deque)에 계속 채우고, 송신 루프는 가장 최근 샘플만 가져다 쓴다.
+    # 센서 읽기(I2C/UART)가 느려도 무선 송신이 그 시간만큼 멈추지 않는다
+    sensor_ring: Deque[Dict[str, Any]] = deque(maxlen=SENSOR_RING_SIZE)
+    sensor_ready, sensor_stop = threading.Event(), threading.Event()
+    sensor_thread: Optional[threading.Thread] = None
+    if sr:
+        sensor_thread = threading.Thread(target=_sensor_producer, args=(sr, sensor_ring, sensor_ready, sensor_stop), name="sensor", daemon=True)
+        sensor_thread.start()
+
+    # 루프가 예외(KeyboardInterrupt, SerialException 등)로 빠져나가도 생산자 스레드를 멈춘다
+    # (포트를 재사용해 send_data를 다시 부르면 두 스레드가 같은 SensorReader를 동시에 읽게 됨)
+    try:
+        # 더미 페이로드는 내용이 의미 없으므로 프레임 템플릿을 한 번만 만들고 루프에서는 SEQ 바이트만 바꾼다
+        dummy_frame: Optional[bytearray] = None
+        if payload_size > 0:
+            tpl = create_frame({}, 0, compression_mode, payload_size)
+            if tpl: dummy_frame = bytearray(tpl)
+
+        for msg_idx in range(1, n + 1):
+            msg_start = time.monotonic()
+            print_separator("메시지 %d/%d (Message SEQ: %d) 시작", msg_idx, n, current_message_seq_counter)
         
-        sample = sr.get_sensor_data() if payload_size == 0 and sr else {}
-        if payload_size == 0 and (not sample or 'ts' not in sample):
-            logger.warning(f"[메시지 {msg_idx}] 유효하지 않은 샘플, 건너뜀.")
-            # 건너뛴 메시지도 로그에 남기기
-            log_tx_event(
-                frame_seq=current_message_seq_counter,
-                attempt_num=0,
-                event_type='SKIP_INVALID_SAMPLE',
-                ts_sent=None,
-                total_attempts_final=0,
-                ack_received_final=False
-            )
-            current_message_seq_counter = (current_message_seq_counter + 1) % 256
-            time.sleep(1)
-            continue
+            sample = {}
+            if sensor_thread is not None:
+                if not sensor_ready.is_set(): sensor_ready.wait(GENERIC_TIMEOUT)  # 첫 샘플만 기다린다
+                if sensor_ring: sample = sensor_ring[-1]
+            if payload_size == 0 and (not sample or 'ts' not in sample):
+                logger.warning("[메시지 %d] 유효하지 않은 샘플, 건너뜀.", msg_idx)
+                # 건너뛴 메시지도 로그에 남기기
+                _queue_tx_event(current_message_seq_counter, 0, EVT_SKIP_INVALID_SAMPLE, None, None, 0, False)
+                current_message_seq_counter = (current_message_seq_counter + 1) % 256
+                _flush_tx_events(); _pace(message_gap, msg_start)
+                continue
 
-        frame_content = create_frame(sample, current_message_seq_counter, compression_mode, payload_size)
-        if not frame_content:
-            logger.warning(f"[메시지 {msg_idx}] 프레임 생성 실패, 건너뜀")
-            # 프레임 생성 실패도 로그에 남기기
-            log_tx_event(
-                frame_seq=current_message_seq_counter,
-                attempt_num=0,
-                event_type='SKIP_FRAME_CREATION_FAIL',
-                ts_sent=None,
-                total_attempts_final=0,
-                ack_received_final=False
-            )
-            current_message_seq_counter = (current_message_seq_counter + 1) % 256
-            time.sleep(1)
-            continue
+            if dummy_frame is not None: dummy_frame[0] = current_message_seq_counter; frame_content = dummy_frame
+            else: frame_content = create_frame(sample, current_message_seq_counter, compression_mode, payload_size)
+            if not frame_content:
+                logger.warning("[메시지 %d] 프레임 생성 실패, 건너뜀", msg_idx)
+                # 프레임 생성 실패도 로그에 남기기
+                _queue_tx_event(current_message_seq_counter, 0, EVT_SKIP_FRAME_CREATION_FAIL, None, None, 0, False)
+                current_message_seq_counter = (current_message_seq_counter + 1) % 256
+                _flush_tx_events(); _pace(message_gap, msg_start)
+                continue
+
+            if dedup:
+                # SEQ 바이트를 뺀 페이로드가 직전에 ACK 된 메시지와 같으면 수신기가 이미 가진 데이터이므로 보내지 않는다
+                # (최대 56바이트라 해시 대신 바이트를 그대로 비교해도 비용이 같고, 충돌로 새 데이터를 건너뛸 일이 없다)
+                payload = bytes(frame_content[1:])
+                if payload == last_acked_payload:
+                    logger.info("[메시지 %d] 직전 전송과 같은 페이로드, 전송 생략", msg_idx)
+                    _queue_tx_event(current_message_seq_counter, 0, EVT_SKIP_DUPLICATE_PAYLOAD, None, None, 0, True)
+                    reliable_ok_count += 1
+                    current_message_seq_counter = (current_message_seq_counter + 1) % 256
+                    _flush_tx_events(); _pace(message_gap, msg_start)
+                    continue
         
-        if mode == "PDR": pdr_messages_tx_initiated_count += 1
-        raw_data_packet = bytes([len(frame_content)]) + frame_content
-        frame_seq_for_ack_handling = frame_content[0]
-
-        # --- Query/Permit (여기는 로깅 생략, 필요 시 추가 가능) ---
-        query_attempts, permission_received = 0, False
-        while not permission_received and query_attempts < effective_retry_query_permit:
-            query_attempts += 1
-            if not _tx_control_packet(s, frame_seq_for_ack_handling, QUERY_TYPE_SEND_REQUEST):
-                if query_attempts < effective_retry_query_permit: time.sleep(0.5); continue
-                else: break
-            permit_ack_bytes = s.read(ACK_PACKET_LEN)
-            if len(permit_ack_bytes) == ACK_PACKET_LEN and struct.unpack("!BB", permit_ack_bytes) == (ACK_TYPE_SEND_PERMIT, frame_seq_for_ack_handling): permission_received = True
-            if not permission_received and query_attempts < effective_retry_query_permit: time.sleep(1)
-        if not permission_received:
-            logger.error(f"[메시지 {msg_idx}] 최종 Permit 미수신. 메시지 실패 처리.")
-            # Permit 실패도 하나의 시도이니 로그에 남기기
-            log_tx_event(
-                frame_seq=frame_seq_for_ack_handling,
-                attempt_num=query_attempts,
-                event_type='PERMIT_FINAL_FAILURE',
-                ts_sent=None,
-                total_attempts_final=query_attempts,
-                ack_received_final=False
-            )
-            current_message_seq_counter = (current_message_seq_counter + 1) % 256
-            time.sleep(1)
-            continue
+            if mode == "PDR": pdr_messages_tx_initiated_count += 1
+            frame_len = len(frame_content)
+            frame_seq_for_ack_handling = frame_content[0]
+
+            if batch_size > 1:
+                raw_data_packet = _LEN_PREFIX[frame_len] + frame_content  # 배치는 tx_buf를 거치지 않고 LEN+frame을 한 번에 만든다
+                # 한 무선 패킷(SUB_PACKET_SIZE)에 들어가지 않으면 지금까지 모은 배치를 먼저 보낸다
+                # 창 모드에서는 비트맵 1바이트에 담기지 않는 SEQ 범위(건너뛴 메시지 포함)도 다음 창으로 넘긴다
+                if tx_batch and (tx_batch_bytes + len(raw_data_packet) + batch_overhead > SUB_PACKET_SIZE
+                                 or windowed and (frame_seq_for_ack_handling - tx_batch[0][1]) % 256 >= WINDOW_MAX):
+                    batch_acked += send_batch(s, tx_batch, data_rto, effective_retry_data_ack)
+                    tx_batch.clear(); tx_batch_bytes = 0
+                tx_batch.append((msg_idx, frame_seq_for_ack_handling, raw_data_packet))
+                tx_batch_bytes += len(raw_data_packet)
+                if len(tx_batch) >= batch_size or msg_idx == n:
+                    batch_acked += send_batch(s, tx_batch, data_rto, effective_retry_data_ack)
+                    tx_batch.clear(); tx_batch_bytes = 0
+                current_message_seq_counter = (current_message_seq_counter + 1) % 256
+                _flush_tx_events()
+                continue
+
+            tx_buf[1] = frame_seq_for_ack_handling; tx_buf[2] = frame_len; tx_buf[3:3 + frame_len] = frame_content
+            data_packet = tx_view[2:3 + frame_len]  # LEN + frame
+            # CSV 이벤트는 기록 스레드가 나중에 읽으므로 사본이 필요하다 (tx_buf는 다음 메시지에서 덮어씀). 기록하지 않으면 뷰를 그대로 쓴다
+            raw_data_packet = bytes(data_packet) if TX_EVENT_LOG else data_packet
+
+            # --- Query/Permit ---
+            # PDR 모드(재전송 없음)와 COALESCE_QUERY_DATA_RELIABLE인 reliable 모드에서는 QUERY를 DATA 앞에 붙여 한 번에 보낸다. 수신기는 QUERY에 PERMIT,
+            # 이어지는 DATA에 DATA_ACK로 차례로 응답하므로 송신 측은 두 응답을 순서대로 읽는다.
+            # 직전 메시지가 방금 ACK 되었다면 수신기는 여전히 수신 가능 상태이므로 Query 왕복을 생략한다.
+            # (수신기는 허가 없이 도착한 DATA 프레임에도 DATA_ACK로 응답한다)
+            permit_implicit = permit_valid_ns > 0 and time.monotonic_ns() - last_data_ack_ns < permit_valid_ns
+            coalesce_query = COALESCE_QUERY_DATA_PDR if mode == "PDR" else COALESCE_QUERY_DATA_RELIABLE and not permit_implicit
+            if coalesce_query:
+                query_attempts, permission_received = 0, True
+            elif permit_implicit:
+                query_attempts, permission_received = 0, True
+                if _debug_enabled: logger.debug("[메시지 %d] 최근 DATA_ACK 기반 묵시적 Permit 사용, Query 생략", msg_idx)
+                _queue_tx_event(frame_seq_for_ack_handling, 0, EVT_PERMIT_REUSED)
+            else:
+                permission_received, query_attempts = _request_permit(s, frame_seq_for_ack_handling, effective_retry_query_permit, ctrl_rto)
+            if not permission_received:
+                logger.error("[메시지 %d] 최종 Permit 미수신. 메시지 실패 처리.", msg_idx)
+                # Permit 실패도 하나의 시도이니 로그에 남기기
+                _queue_tx_event(frame_seq_for_ack_handling, query_attempts, EVT_PERMIT_FINAL_FAILURE, None, None, query_attempts, False)
+                current_message_seq_counter = (current_message_seq_counter + 1) % 256
+                _flush_tx_events(); _pace(message_gap, msg_start)
+                continue
         
-        # --- 데이터 전송 및 ACK 확인 (상세 로깅) ---
-        data_tx_attempts, data_ack_received = 0, False
-        ts_sent_for_attempt = None
-        while not data_ack_received and data_tx_attempts < effective_retry_data_ack:
-            data_tx_attempts += 1
+            # --- 데이터 전송 및 ACK 확인 (상세 로깅) ---
+            data_tx_attempts, data_ack_received = 0, False
+            ts_sent_for_attempt = None
+            expected_data_ack = _EXPECTED_DATA_ACK_TABLE[frame_seq_for_ack_handling]
+            while not data_ack_received and data_tx_attempts < effective_retry_data_ack:
+                data_tx_attempts += 1
+                if data_tx_attempts > 1: _ack_reader.discard(s)  # 늦게 도착한 이전 응답을 이번 DATA_ACK로 오인하지 않도록
             
-            # 데이터 전송 시도 로깅
-            sent_ok, ts_sent_for_attempt = _tx_data_packet(s, raw_data_packet)
-            log_tx_event(frame_seq=frame_seq_for_ack_handling, attempt_num=data_tx_attempts, event_type='DATA_SENT' if sent_ok else 'DATA_SEND_FAIL', ts_sent=ts_sent_for_attempt, payload=raw_data_packet)
-            if not sent_ok:
-                if data_tx_attempts < effective_retry_data_ack: time.sleep(1); continue
-                else: break
-
-            # ACK 수신 결과 로깅
-            data_ack_bytes = s.read(ACK_PACKET_LEN)
-            ts_ack_interaction_end = datetime.datetime.now(datetime.timezone.utc)
-
-            if len(data_ack_bytes) == ACK_PACKET_LEN:
-                try:
-                    ack_type, ack_seq = struct.unpack("!BB", data_ack_bytes)
-                    if ack_type == ACK_TYPE_DATA and ack_seq == frame_seq_for_ack_handling:
+                # 데이터 전송 시도 로깅
+                tx_start_ns = mono_ns()
+                if coalesce_query: sent_ok, ts_sent_for_attempt = tx_data(s, tx_view[:3 + frame_len])
+                else: sent_ok, ts_sent_for_attempt = tx_data(s, data_packet)
+                queue_evt(frame_seq_for_ack_handling, data_tx_attempts, EVT_DATA_SENT if sent_ok else EVT_DATA_SEND_FAIL, ts_sent_for_attempt, None, None, None, raw_data_packet)
+                if not sent_ok:
+                    if data_tx_attempts < effective_retry_data_ack: time.sleep(_backoff(data_tx_attempts)); continue
+                    else: break
+
+                # ACK 수신 결과 로깅
+                ack_timeout = data_rto.timeout()
+                data_ack_bytes = read_ack(s, ACK_PACKET_LEN, ack_timeout)
+                if coalesce_query and len(data_ack_bytes) == ACK_PACKET_LEN and data_ack_bytes[0] == ACK_TYPE_SEND_PERMIT:
+                    # 병합 QUERY에 대한 PERMIT이 DATA_ACK보다 먼저 온다. PERMIT이 유실되면 첫 응답이 곧 DATA_ACK이다
+                    data_ack_bytes = read_ack(s, ACK_PACKET_LEN, ack_timeout)
+                ts_ack_interaction_end = wall_ns()
+
+                if len(data_ack_bytes) == ACK_PACKET_LEN:
+                    if data_ack_bytes == expected_data_ack:
                         data_ack_received = True
+                        last_data_ack_ns = mono_ns()
+                        if data_tx_attempts == 1: data_rto.sample(last_data_ack_ns - tx_start_ns)
+                        permit_valid_ns = int(INTER_MESSAGE_DELAY * 1e9) + PERMIT_REUSE_RTT_FACTOR * (last_data_ack_ns - tx_start_ns)
                         if mode == "PDR": pdr_data_acks_received_count += 1
-                        log_tx_event(frame_seq=frame_seq_for_ack_handling, attempt_num=data_tx_attempts, event_type='DATA_ACK_OK', ts_sent=ts_sent_for_attempt, ts_ack_interaction_end=ts_ack_interaction_end, total_attempts_final=data_tx_attempts, ack_received_final=True, payload=raw_data_packet)
+                        queue_evt(frame_seq_for_ack_handling, data_tx_attempts, EVT_DATA_ACK_OK, ts_sent_for_attempt, ts_ack_interaction_end, data_tx_attempts, True, raw_data_packet)
                     else:
-                        log_tx_event(frame_seq=frame_seq_for_ack_handling, attempt_num=data_tx_attempts, event_type='DATA_ACK_INVALID', ts_sent=ts_sent_for_attempt, ts_ack_interaction_end=ts_ack_interaction_end, payload=raw_data_packet)
-                except struct.error:
-                    log_tx_event(frame_seq=frame_seq_for_ack_handling, attempt_num=data_tx_attempts, event_type='DATA_ACK_UNPACK_FAIL', ts_sent=ts_sent_for_attempt, ts_ack_interaction_end=ts_ack_interaction_end, payload=raw_data_packet)
-            else:
-                log_tx_event(frame_seq=frame_seq_for_ack_handling, attempt_num=data_tx_attempts, event_type='DATA_ACK_TIMEOUT', ts_sent=ts_sent_for_attempt, ts_ack_interaction_end=ts_ack_interaction_end, payload=raw_data_packet)
+                        queue_evt(frame_seq_for_ack_handling, data_tx_attempts, EVT_DATA_ACK_INVALID, ts_sent_for_attempt, ts_ack_interaction_end, None, None, raw_data_packet)
+                else:
+                    if not data_ack_bytes: data_rto.on_timeout()
+                    queue_evt(frame_seq_for_ack_handling, data_tx_attempts, EVT_DATA_ACK_TIMEOUT, ts_sent_for_attempt, ts_ack_interaction_end, None, None, raw_data_packet)
             
-            if not data_ack_received and data_tx_attempts < effective_retry_data_ack: time.sleep(1)
+                # 재전송 전 별도 sleep 없음: backoff는 data_rto의 다음 read 타임아웃에 포함된다
+                if not data_ack_received and data_tx_attempts < effective_retry_data_ack:
+                    if permit_implicit:
+                        # 묵시적 Permit이 통하지 않았으므로 캐시를 버리고 정식 Query/Permit 절차로 돌아간다
+                        permit_implicit, permit_valid_ns = False, 0
+                        if not _request_permit(s, frame_seq_for_ack_handling, effective_retry_query_permit, ctrl_rto)[0]: break
 
-        # 최종 결과 처리
-        if data_ack_received:
-            if mode == "reliable": reliable_ok_count += 1
-            logger.info(f"[메시지 {msg_idx}] 전송 완료 ({msg_idx}/{n})")
-        else:
-            logger.error(f"[메시지 {msg_idx}] 최종 데이터 ACK 미수신. 메시지 실패 처리.")
-            # 최종 실패에 대한 명시적 로그 추가
-            log_tx_event(frame_seq=frame_seq_for_ack_handling, attempt_num=data_tx_attempts, event_type='DATA_FINAL_FAILURE', ts_sent=ts_sent_for_attempt, ts_ack_interaction_end=datetime.datetime.now(datetime.timezone.utc), total_attempts_final=data_tx_attempts, ack_received_final=False, payload=raw_data_packet)
+            # 최종 결과 처리
+            if data_ack_received:
+                if mode == "reliable": reliable_ok_count += 1
+                if dedup: last_acked_payload = payload
+                logger.info("[메시지 %d] 전송 완료 (%d/%d)", msg_idx, msg_idx, n)
+            else:
+                logger.error("[메시지 %d] 최종 데이터 ACK 미수신. 메시지 실패 처리.", msg_idx)
+                permit_valid_ns = 0
+                # 최종 실패에 대한 명시적 로그 추가
+                _queue_tx_event(frame_seq_for_ack_handling, data_tx_attempts, EVT_DATA_FINAL_FAILURE, ts_sent_for_attempt, time.time_ns(), data_tx_attempts, False, raw_data_packet)
+
+            current_message_seq_counter = (current_message_seq_counter + 1) % 256
+            _flush_tx_events()
+            if mode == "reliable": _pace(message_gap, msg_start)
+            else: time.sleep(_uart_tx_remaining(s, len(raw_data_packet) + (CTRL_PACKET_LEN if coalesce_query else 0), tx_start_ns))
 
-        current_message_seq_counter = (current_message_seq_counter + 1) % 256
-        time.sleep(1)
+        if tx_batch: batch_acked += send_batch(s, tx_batch, data_rto, effective_retry_data_ack)  # 마지막 메시지가 건너뛰어진 경우
+        if mode == "PDR": pdr_data_acks_received_count += batch_acked
+        else: reliable_ok_count += batch_acked
+        _flush_tx_events(); flush_tx_log()  # 반환 시점에는 CSV가 완성되어 있도록 기록 스레드를 기다린다
+    finally:
+        if sensor_thread: sensor_stop.set(); sensor_thread.join()
 
-    # --- 최종 결과 출력 (변경 없음) ---
+    # --- 최종 결과 출력 ---
     final_return_value: int
     if mode == "PDR":
         pdr = (pdr_data_acks_received_count / n) if n > 0 else 0.0
-        logger.info(f"PDR Mode 결과: {pdr_data_acks_received_count}/{n} ({pdr:.2%}) 성공"); final_return_value = pdr_data_acks_received_count
-    else: logger.info(f"신뢰성 전송 완료: {reliable_ok_count}/{n} 메시지 성공"); final_return_value = reliable_ok_count
+        logger.info("PDR Mode 결과: %d/%d (%.2f%%) 성공", pdr_data_acks_received_count, n, pdr * 100); final_return_value = pdr_data_acks_received_count
+    else: logger.info("신뢰성 전송 완료: %d/%d 메시지 성공", reliable_ok_count, n); final_return_value = reliable_ok_count
 
-    if s and s.is_open: s.close()
     return final_return_value
 
-# --- Main 실행 블록 (변경 없음) ---
+# --- Main 실행 블록 ---
 if __name__ == '__main__':
-    logging.getLogger().setLevel(logging.INFO)
-    if len(sys.argv) != 3: print("사용법: python sender.py <mode> <payload_size>\n  <mode>: raw, bam\n  <payload_size>: 0, 8, 16, 24, 32"); sys.exit(1)
+    # 패킷 Hex 덤프가 필요하면 CHIRP_LOGLEVEL=DEBUG 로 실행 (기본 INFO에서는 Hex 포맷팅 비용 없음)
+    logging.getLogger().setLevel(os.environ.get("CHIRP_LOGLEVEL", "INFO").upper())
+    TX_EVENT_LOG = os.environ.get("CHIRP_TX_CSV", "1") != "0"
+    if len(sys.argv) not in (3, 4): print("사용법: [CHIRP_LOGLEVEL=DEBUG] [CHIRP_TX_CSV=0] [CHIRP_BAUD=9600] python sender.py <mode> <payload_size> [batch_size]\n  <mode>: raw, bam\n  <payload_size>: 0, 8, 16, 24, 32\n  [batch_size]: 한 번에 묶어 보낼 프레임 수 (기본 1)"); sys.exit(1)
     comp_mode_arg = sys.argv[1].lower()
     if comp_mode_arg not in ['raw', 'bam']: print(f"오류: 잘못된 모드 '{comp_mode_arg}'. 'raw' 또는 'bam' 사용."); sys.exit(1)
     try: payload_size_arg = int(sys.argv[2]); assert payload_size_arg in [0, 8, 16, 24, 32]
     except (ValueError, AssertionError): print(f"오류: 잘못된 payload_size '{sys.argv[2]}'. 0, 8, 16, 24, 32 중 하나 사용."); sys.exit(1)
+    try: batch_size_arg = int(sys.argv[3]) if len(sys.argv) == 4 else 1; assert batch_size_arg >= 1
+    except (ValueError, AssertionError): print(f"오류: 잘못된 batch_size '{sys.argv[3]}'. 1 이상의 정수 사용."); sys.exit(1)
 
     payload_str = "Sensor Data" if payload_size_arg == 0 else f"Dummy {payload_size_arg}B"
-    logger.info(f"\n{'='*10} PDR 모드 테스트 시작 (Mode: {comp_mode_arg}, Payload: {payload_str}) {'='*10}")
-    pdr_acks_received = send_data(n=SEND_COUNT, mode="PDR", compression_mode=comp_mode_arg, payload_size=payload_size_arg)
-    logger.info(f"PDR 모드 테스트 종료, 수신된 데이터 ACK 총계: {pdr_acks_received}\n{'='*40}")
\ No newline at end of file
+    logger.info("\n%s PDR 모드 테스트 시작 (Mode: %s, Payload: %s) %s", '='*10, comp_mode_arg, payload_str, '='*10)
+    pdr_acks_received = send_data(n=SEND_COUNT, mode="PDR", compression_mode=comp_mode_arg, payload_size=payload_size_arg, batch_size=batch_size_arg)
+    logger.info("PDR 모드 테스트 종료, 수신된 데이터 ACK 총계: %d\n%s", pdr_acks_received, '='*40)
\ No newline at end of file
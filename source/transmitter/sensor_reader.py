@@ -4,7 +4,6 @@
 from __future__ import annotations
 
 import os, time, json, csv, struct, serial, logging, random
-from collections import deque
 from typing import Dict, Any, Optional # 타입 힌팅 추가
 
 MPU_PORT = os.getenv("MPU_PORT", "/dev/ttyAMA2")
@@ -12,39 +11,34 @@ MPU_BAUD = 115200
 GPS_PORT = os.getenv("GPS_PORT", "/dev/ttyAMA4") # GPS 포트 추가
 GPS_BAUD = 9600
 LOG_DIR  = "data/raw"; os.makedirs(LOG_DIR, exist_ok=True)
+JSONL_BUFFER_SIZE = 1 << 20  # run_logger JSONL 쓰기 버퍼 (바이트)
+JSONL_FLUSH_EVERY = 256      # 이 샘플 수마다 한 번씩 디스크로 flush
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 
 # --- MPU 관련 클래스 (기존과 거의 동일) ---
+# WT901 계열 11바이트 패킷: 0x55, 종류, int16 x3 (LE), 온도, 체크섬
+_MPU_AXES = struct.Struct('<3h')
+_MPU_KINDS = {
+    0x51: ("accel", ("ax", "ay", "az"), 16),
+    0x52: ("gyro", ("gx", "gy", "gz"), 2000),
+    0x53: ("angle", ("roll", "pitch", "yaw"), 180),
+}
+
 class _RealMPU:
     def __init__(self, port: str):
         self.ser = serial.Serial(port, MPU_BAUD, timeout=0.05)
-        self.buf: deque[int] = deque()
+        self.buf = bytearray(); self._pos = 0  # 아직 처리하지 않은 첫 바이트 위치
         self.last: dict = {}
         logging.info(f"MPU 연결 성공: {port}")
 
-    def _s16(self, b):
-        return struct.unpack('<h', b)[0]
-
     def _parse(self, p: bytes) -> Optional[Dict[str, Any]]:
         if p[0] != 0x55: return None
-        kind = p[1]
-        if kind == 0x51:
-            return {"accel": {
-                "ax": self._s16(p[2:4]) / 32768 * 16,
-                "ay": self._s16(p[4:6]) / 32768 * 16,
-                "az": self._s16(p[6:8]) / 32768 * 16}}
-        if kind == 0x52:
-            return {"gyro": {
-                "gx": self._s16(p[2:4]) / 32768 * 2000,
-                "gy": self._s16(p[4:6]) / 32768 * 2000,
-                "gz": self._s16(p[6:8]) / 32768 * 2000}}
-        if kind == 0x53:
-            return {"angle": {
-                "roll":  self._s16(p[2:4]) / 32768 * 180,
-                "pitch": self._s16(p[4:6]) / 32768 * 180,
-                "yaw":   self._s16(p[6:8]) / 32768 * 180}}
-        return None
+        spec = _MPU_KINDS.get(p[1])
+        if spec is None: return None
+        group, (k1, k2, k3), scale = spec
+        x, y, z = _MPU_AXES.unpack_from(p, 2)  # 세 축을 한 번의 C 호출로 읽음
+        return {group: {k1: x / 32768 * scale, k2: y / 32768 * scale, k3: z / 32768 * scale}}
 
     def poll(self) -> Optional[Dict[str, Any]]:
         try:
@@ -52,28 +46,23 @@ class _RealMPU:
                 logging.error("MPU 시리얼 포트가 닫혀있습니다.")
                 return self.last or None
             
-            self.buf.extend(self.ser.read(33))
+            self.buf += self.ser.read(33)
         except serial.SerialException as e:
-            logging.error(f"MPU 데이터 읽기 중 시리얼 오류 발생: {e}")
+            logging.error("MPU 데이터 읽기 중 시리얼 오류 발생: %s", e)
             return self.last or None
 
         updated = {}
-        while len(self.buf) >= 11:
-            if self.buf[0] != 0x55:
-                self.buf.popleft(); continue
-            pkt_bytes = []
-            for _ in range(11): 
-                if not self.buf:
-                    logging.warning("MPU 데이터 파싱 중 예상치 못하게 버퍼가 비었습니다.")
-                    break
-                pkt_bytes.append(self.buf.popleft())
-            
-            if len(pkt_bytes) == 11:
-                pkt = bytes(pkt_bytes)
-                r = self._parse(pkt)
-                if r: updated.update(r)
-            else: 
-                logging.warning(f"MPU 패킷 구성 중 바이트 부족 (필요: 11, 실제: {len(pkt_bytes)}).")
+        buf, pos = self.buf, self._pos
+        while True:
+            i = buf.find(0x55, pos)  # 헤더 동기화는 C 수준 검색으로
+            if i < 0: pos = len(buf); break
+            if len(buf) - i < 11: pos = i; break  # 나머지는 다음 read에서 이어 붙임
+            r = self._parse(buf[i:i + 11])
+            if r: updated.update(r)
+            pos = i + 11
+        # 처리한 앞부분은 절반 이상 쌓였을 때만 한 번에 잘라낸다
+        if pos > len(buf) // 2: del buf[:pos]; pos = 0
+        self._pos = pos
 
         if updated: self.last.update(updated)
         return self.last or None
@@ -124,9 +113,9 @@ class _RealGPS:
                     self.max_satellites_observed = num_satellites
                 # logging.debug(f"[GGA] FIX: {self.current_data['fix']} Sat: {num_satellites} Alt: {self.current_data['altitude']}m (Max Obs: {self.max_satellites_observed})")
         except ValueError as e:
-            logging.warning(f"GPGGA 파싱 오류 (ValueError): {e} - Fields: {fields}")
+            logging.warning("GPGGA 파싱 오류 (ValueError): %s - Fields: %s", e, fields)
         except IndexError as e:
-            logging.warning(f"GPGGA 파싱 오류 (IndexError): {e} - Fields: {fields}")
+            logging.warning("GPGGA 파싱 오류 (IndexError): %s - Fields: %s", e, fields)
 
 
     def _parse_gprmc(self, fields: list[str]) -> None:
@@ -167,9 +156,9 @@ class _RealGPS:
                     self.current_data["lat"] = 0.0
                     self.current_data["lon"] = 0.0
         except ValueError as e:
-            logging.warning(f"GPRMC 파싱 오류 (ValueError): {e} - Fields: {fields}")
+            logging.warning("GPRMC 파싱 오류 (ValueError): %s - Fields: %s", e, fields)
         except IndexError as e:
-            logging.warning(f"GPRMC 파싱 오류 (IndexError): {e} - Fields: {fields}")
+            logging.warning("GPRMC 파싱 오류 (IndexError): %s - Fields: %s", e, fields)
 
     def poll(self) -> Dict[str, Any]:
         lines_read = 0
@@ -198,9 +187,9 @@ class _RealGPS:
                         self.last_rmc_fields = fields
                         self._parse_gprmc(fields)
                 except UnicodeDecodeError:
-                    logging.warning(f"GPS 데이터 디코딩 오류: {line_bytes!r}")
+                    logging.warning("GPS 데이터 디코딩 오류: %r", line_bytes)
                 except Exception as e:
-                    logging.error(f"GPS 라인 처리 중 예외: {e} - Line: {line_bytes!r}")
+                    logging.error("GPS 라인 처리 중 예외: %s - Line: %r", e, line_bytes)
             
             # GGA와 RMC 중 어떤 것이 더 최신인지 알 수 없으므로,
             # 가장 최근에 파싱된 데이터를 기반으로 현재 상태를 업데이트하는 것이 좋을 수 있으나,
@@ -208,10 +197,10 @@ class _RealGPS:
             return self.current_data
 
         except serial.SerialException as e:
-            logging.error(f"GPS 데이터 읽기 중 시리얼 오류 발생: {e}")
+            logging.error("GPS 데이터 읽기 중 시리얼 오류 발생: %s", e)
             return self.current_data # 오류 시 이전 데이터 반환
         except Exception as e:
-            logging.error(f"GPS poll 중 예기치 않은 오류: {e}")
+            logging.error("GPS poll 중 예기치 않은 오류: %s", e)
             return self.current_data
 
 
@@ -301,7 +290,7 @@ class SensorReader:
                 logging.error("MPU 객체가 초기화되지 않았습니다.")
                 mpu_data = {}
         except Exception as e:
-            logging.error(f"MPU 데이터 가져오는 중 오류 발생: {e}")
+            logging.error("MPU 데이터 가져오는 중 오류 발생: %s", e)
             mpu_data = {}
 
         d.update(mpu_data or {})
@@ -331,15 +320,26 @@ class SensorReader:
 
         return d
 
+_INSTANCE: Optional[SensorReader] = None
+
+def get_reader() -> SensorReader:
+    """프로세스 안에서 하나의 SensorReader를 재사용합니다 (MPU 포트 열기와 GPS 선택을 한 번만)."""
+    global _INSTANCE
+    if _INSTANCE is None: _INSTANCE = SensorReader()
+    return _INSTANCE
+
+_EMPTY: Dict[str, Any] = {}
+
 # --- run_logger 함수 (기존과 거의 동일, SensorReader 초기화 실패 처리 강화) ---
 def run_logger(rate: float = 10.0, target: int = 1000):
     try:
-        sr = SensorReader()
+        sr = get_reader()
     except Exception as e:
         logging.critical(f"SensorReader 초기화 실패로 로거 실행 불가: {e}")
         return
 
     interval = 1.0 / rate
+    progress_every = max(1, int(rate * 10))  # 약 10초마다 진행 로그 (rate < 1 이어도 0으로 나누지 않도록)
     # ... (나머지 run_logger 로직은 기존과 동일하게 유지) ...
     ts_start = int(time.time())
     json_path = os.path.join(LOG_DIR, f"log_{ts_start}.jsonl")
@@ -348,45 +348,40 @@ def run_logger(rate: float = 10.0, target: int = 1000):
     fields = ["ts", "ax", "ay", "az", "gx", "gy", "gz", "roll", "pitch", "yaw", "lat", "lon", "satellites", "fix_quality", "altitude", "max_satellites_observed"]
     
     try:
-        with open(json_path, "w", encoding="utf-8") as fj, \
+        with open(json_path, "w", encoding="utf-8", buffering=JSONL_BUFFER_SIZE) as fj, \
              open(csv_path, "w", newline="", encoding="utf-8") as fc:
             
-            cw = csv.DictWriter(fc, fieldnames=fields, extrasaction='ignore') # extrasaction='ignore' 추가
-            cw.writeheader()
+            cw = csv.writer(fc)
+            cw.writerow(fields)
             
             logging.info(f"{target}개의 샘플 로깅 시작...")
+            # 절대 마감 시각(monotonic) 기준으로 쉬어서 샘플 처리 시간만큼 주기가 밀리지 않게 한다
+            next_t = time.monotonic()
             for i in range(target):
-                t0 = time.time()
                 s = sr.get_sensor_data()
                 
-                fj.write(json.dumps(s) + "\n")
+                fj.write(json.dumps(s)); fj.write("\n")
+                if (i + 1) % JSONL_FLUSH_EVERY == 0: fj.flush()
                 
-                row_data = {
-                    "ts": s.get("ts", ""),
-                    "ax": s.get("accel", {}).get("ax", ""),
-                    "ay": s.get("accel", {}).get("ay", ""),
-                    "az": s.get("accel", {}).get("az", ""),
-                    "gx": s.get("gyro", {}).get("gx", ""),
-                    "gy": s.get("gyro", {}).get("gy", ""),
-                    "gz": s.get("gyro", {}).get("gz", ""),
-                    "roll": s.get("angle", {}).get("roll", ""),
-                    "pitch": s.get("angle", {}).get("pitch", ""),
-                    "yaw": s.get("angle", {}).get("yaw", ""),
-                    "lat": s.get("gps", {}).get("lat", ""),
-                    "lon": s.get("gps", {}).get("lon", ""),
-                    "satellites": s.get("gps", {}).get("satellites", ""),
-                    "fix_quality": s.get("gps", {}).get("fix_quality", ""),
-                    "altitude": s.get("gps", {}).get("altitude", ""),
-                    "max_satellites_observed": s.get("gps", {}).get("max_satellites_observed", "")
-                }
-                cw.writerow(row_data)
+                # fields 순서 그대로 위치 기반 행을 만든다 (DictWriter의 행마다 필드 매핑 생략)
+                accel = s.get("accel") or _EMPTY; gyro = s.get("gyro") or _EMPTY
+                angle = s.get("angle") or _EMPTY; gps = s.get("gps") or _EMPTY
+                cw.writerow((
+                    s.get("ts", ""),
+                    accel.get("ax", ""), accel.get("ay", ""), accel.get("az", ""),
+                    gyro.get("gx", ""), gyro.get("gy", ""), gyro.get("gz", ""),
+                    angle.get("roll", ""), angle.get("pitch", ""), angle.get("yaw", ""),
+                    gps.get("lat", ""), gps.get("lon", ""), gps.get("satellites", ""),
+                    gps.get("fix_quality", ""), gps.get("altitude", ""), gps.get("max_satellites_observed", ""),
+                ))
                 
-                elapsed_time = time.time() - t0
-                sleep_duration = max(0, interval - elapsed_time)
-                time.sleep(sleep_duration)
+                next_t += interval
+                sleep_duration = next_t - time.monotonic()
+                if sleep_duration > 0: time.sleep(sleep_duration)
+                elif sleep_duration < -interval: next_t = time.monotonic()  # 한 주기 넘게 밀렸으면 몰아서 따라잡지 않고 다시 맞춤
                 
-                if (i + 1) % (int(rate) * 10) == 0: # rate가 float일 수 있으므로 int로 변환
-                    logging.info(f"진행: {i+1}/{target} 샘플 로깅됨.")
+                if (i + 1) % progress_every == 0:
+                    logging.info("진행: %d/%d 샘플 로깅됨.", i + 1, target)
 
     except IOError as e:
         logging.error(f"로그 파일 작업 중 오류 발생 ({json_path} 또는 {csv_path}): {e}")
@@ -1,17 +1,31 @@
 # ChirpChirp/source/transmitter/tx_logger.py
 # -*- coding: utf-8 -*-
 
-import csv
+import atexit
 import os
 import datetime
 import logging
+import queue
+import threading
+import time
 import binascii  # 페이로드를 Hex로 변환하기 위해 추가
-from typing import Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 # --- 설정 (Configuration) ---
 tx_internal_logger = logging.getLogger(__name__)
 
 _log_file_path: Optional[str] = None
+TX_LOG_BUFFER_SIZE = int(os.environ.get("CHIRP_TX_LOG_BUF", "65536"))  # 세션 CSV 쓰기 버퍼 (바이트)
+# 세션 CSV는 한 번만 열어 두고 이벤트마다 open/close 하지 않는다
+_log_fp = None
+_file_lock = threading.Lock()
+
+# 타임스탬프 호출마다 반복되는 속성 조회를 피하기 위해 한 번만 바인딩
+_UTC = datetime.timezone.utc
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=_UTC)
+
+# 타임스탬프는 datetime 또는 time.time_ns() 정수(UTC 에포크 기준 ns) 모두 받는다
+Timestamp = Union[datetime.datetime, int]
 
 # CSV 파일 헤더에 'payload_hex' 추가
 CSV_HEADER = [
@@ -26,13 +40,62 @@ CSV_HEADER = [
     "timestamp_ack_interaction_end_utc" # (응답 시) ACK 관련 상호작용이 끝난 UTC 시점
 ]
 
+# 헤더도 행(_ROW_FMT)과 같은 방식으로 직접 쓴다 (열 이름에 따옴표가 필요한 문자가 없음, 줄 끝 \r\n)
+_HEADER_LINE = ",".join(CSV_HEADER) + "\r\n"
+
+# 송신 이벤트 유형 ID. 송신 루프는 정수 ID만 넘기고 문자열(EVENT_NAMES)은 기록 스레드에서 붙인다
+EVT_HANDSHAKE_SYN_SENT        = 0
+EVT_HANDSHAKE_SYN_FAIL        = 1
+EVT_HANDSHAKE_ACK_OK          = 2
+EVT_HANDSHAKE_ACK_INVALID     = 3
+EVT_HANDSHAKE_ACK_UNPACK_FAIL = 4
+EVT_HANDSHAKE_ACK_TIMEOUT     = 5
+EVT_DATA_SENT                 = 6
+EVT_DATA_SEND_FAIL            = 7
+EVT_DATA_ACK_OK               = 8
+EVT_DATA_ACK_INVALID          = 9
+EVT_DATA_ACK_UNPACK_FAIL      = 10
+EVT_DATA_ACK_TIMEOUT          = 11
+EVT_DATA_FINAL_FAILURE        = 12
+EVT_PERMIT_REUSED             = 13
+EVT_PERMIT_FINAL_FAILURE      = 14
+EVT_SKIP_INVALID_SAMPLE       = 15
+EVT_SKIP_FRAME_CREATION_FAIL  = 16
+EVT_SKIP_DUPLICATE_PAYLOAD    = 17
+EVENT_NAMES = (
+    "HANDSHAKE_SYN_SENT",
+    "HANDSHAKE_SYN_FAIL",
+    "HANDSHAKE_ACK_OK",
+    "HANDSHAKE_ACK_INVALID",
+    "HANDSHAKE_ACK_UNPACK_FAIL",
+    "HANDSHAKE_ACK_TIMEOUT",
+    "DATA_SENT",
+    "DATA_SEND_FAIL",
+    "DATA_ACK_OK",
+    "DATA_ACK_INVALID",
+    "DATA_ACK_UNPACK_FAIL",
+    "DATA_ACK_TIMEOUT",
+    "DATA_FINAL_FAILURE",
+    "PERMIT_REUSED",
+    "PERMIT_FINAL_FAILURE",
+    "SKIP_INVALID_SAMPLE",
+    "SKIP_FRAME_CREATION_FAIL",
+    "SKIP_DUPLICATE_PAYLOAD",
+)
+
+# 이벤트 튜플의 필드 순서 (_build_row 위치 인자와 동일)
+TxEvent = Tuple[int, int, int, Optional[Timestamp], Optional[Timestamp], Optional[int], Optional[bool], Optional[bytes], Optional[Timestamp]]
+_TX_EVENT_FIELDS = ("frame_seq", "attempt_num", "event_type", "ts_sent", "ts_ack_interaction_end",
+                    "total_attempts_final", "ack_received_final", "payload", "ts_logged")  # 오류 로그용 열 이름
+
 
 def start_new_log_session():
     """
     새로운 측정 세션을 시작하고, 새 로그 파일을 생성합니다.
     """
     global _log_file_path
-    _log_file_path = None 
+    flush_tx_log()  # 이전 세션의 비동기 기록이 새 파일로 섞이지 않도록 먼저 비운다
+    _close_session_log_file()
     _initialize_session_log_file()
 
 
@@ -40,7 +103,7 @@ def _initialize_session_log_file():
     """
     현재 전송 세션을 위한 새 로그 파일을 생성하고 헤더를 작성합니다.
     """
-    global _log_file_path
+    global _log_file_path, _log_fp
     if _log_file_path is not None:
         return
 
@@ -54,10 +117,10 @@ def _initialize_session_log_file():
         session_start_time_str = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         filepath = os.path.join(log_dir_absolute, f"tx_session_{session_start_time_str}.csv")
 
-        with open(filepath, mode='w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(CSV_HEADER)
+        fp = open(filepath, mode='w', newline='', encoding='utf-8', buffering=TX_LOG_BUFFER_SIZE)
+        fp.write(_HEADER_LINE); fp.flush()
         
+        with _file_lock: _log_fp = fp
         _log_file_path = filepath
         tx_internal_logger.info(f"새로운 송신 로그 세션 시작. 파일: {_log_file_path}")
 
@@ -66,61 +129,182 @@ def _initialize_session_log_file():
         _log_file_path = None
 
 
+def _close_session_log_file():
+    """현재 세션 로그 파일을 닫습니다."""
+    global _log_file_path, _log_fp
+    with _file_lock:
+        fp, _log_fp, _log_file_path = _log_fp, None, None
+        if fp is None: return
+        try: fp.close()
+        except (IOError, OSError) as e: tx_internal_logger.error("로그 파일 닫기 실패: %s", e)
+
+
+_NS_PER_DAY = 86400 * 10**9
+_day_cache: Tuple[int, str] = (-1, "")  # (UTC 자정 ns, "YYYY-MM-DDT") - 날짜가 바뀔 때만 다시 만든다
+
+
+def _ts_iso(ts: Optional[Timestamp]) -> str:
+    """타임스탬프를 로그용 ISO 문자열로 변환합니다. ns 정수는 datetime을 만들지 않고 날짜 접두어만 캐시해 포맷합니다."""
+    global _day_cache
+    if ts is None: return ''
+    if isinstance(ts, int):
+        day_ns = ts - ts % _NS_PER_DAY
+        if _day_cache[0] != day_ns:
+            _day_cache = (day_ns, (_EPOCH + datetime.timedelta(microseconds=day_ns // 1000)).strftime("%Y-%m-%dT"))
+        s, ms = divmod((ts - day_ns) // 1000000, 1000); m, s = divmod(s, 60); h, m = divmod(m, 60)
+        # datetime(UTC).isoformat(timespec="milliseconds") + "Z" 와 같은 형식
+        return "%s%02d:%02d:%02d.%03d+00:00Z" % (_day_cache[1], h, m, s, ms)
+    return ts.isoformat(timespec="milliseconds") + "Z"
+
+
+# 모든 열이 숫자/ISO 시각/이벤트 이름/hex/bool 이라 따옴표 처리가 필요 없으므로 csv 모듈 없이 직접 포맷한다
+# (줄 끝은 기존 csv.writer 기본값과 같은 \r\n)
+_ROW_FMT = "%s,%s,%s,%s,%s,%s,%s,%s,%s\r\n"
+
+
+def _build_row(
+    frame_seq: int,
+    attempt_num: int,
+    event_type: Union[str, int],
+    ts_sent: Optional[Timestamp] = None,
+    ts_ack_interaction_end: Optional[Timestamp] = None,
+    total_attempts_final: Optional[int] = None,
+    ack_received_final: Optional[bool] = None,
+    payload: Optional[bytes] = None,
+    ts_logged: Optional[Timestamp] = None
+) -> str:
+    """이벤트 하나를 CSV_HEADER 순서의 CSV 한 줄로 변환합니다. event_type은 문자열 또는 EVT_* ID입니다."""
+    if isinstance(event_type, int): event_type = EVENT_NAMES[event_type]
+    # CSV_HEADER 순서 그대로 바로 만든다 (ts_logged가 없으면 지금 시각을 기록 시점으로 사용)
+    return _ROW_FMT % (
+        _ts_iso(ts_logged if ts_logged is not None else time.time_ns()),
+        frame_seq,
+        attempt_num,
+        event_type,
+        total_attempts_final if total_attempts_final is not None else '',
+        ack_received_final if ack_received_final is not None else '',
+        binascii.hexlify(payload).decode('ascii') if payload else '',
+        _ts_iso(ts_sent),
+        _ts_iso(ts_ack_interaction_end),
+    )
+
+
 def log_tx_event(
     frame_seq: int,
     attempt_num: int,
     event_type: str,
-    ts_sent: Optional[datetime.datetime] = None,
-    ts_ack_interaction_end: Optional[datetime.datetime] = None,
+    ts_sent: Optional[Timestamp] = None,
+    ts_ack_interaction_end: Optional[Timestamp] = None,
     total_attempts_final: Optional[int] = None,
     ack_received_final: Optional[bool] = None,
-    payload: Optional[bytes] = None  # payload를 인자로 추가
+    payload: Optional[bytes] = None,  # payload를 인자로 추가
+    ts_logged: Optional[Timestamp] = None
 ):
     """
     송신 관련 이벤트를 현재 세션의 CSV 로그 파일에 기록합니다.
     """
-    global _log_file_path
-    
+    log_tx_events_batch([dict(
+        frame_seq=frame_seq, attempt_num=attempt_num, event_type=event_type,
+        ts_sent=ts_sent, ts_ack_interaction_end=ts_ack_interaction_end,
+        total_attempts_final=total_attempts_final, ack_received_final=ack_received_final,
+        payload=payload, ts_logged=ts_logged
+    )])
+
+
+def log_tx_events_batch(events: Iterable[Union[Dict[str, Any], TxEvent]], flush: bool = True):
+    """
+    여러 송신 이벤트(log_tx_event 인자 dict 또는 TxEvent 튜플)를 열어 둔 세션 파일에 한 번에 기록합니다.
+    flush=False 이면 버퍼에만 쓰고 디스크 반영은 다음 flush로 미룹니다.
+    """
+    events = list(events)
+    if not events:
+        return
+
     if not _log_file_path:
-        tx_internal_logger.warning(f"로그 파일이 준비되지 않아 이벤트 로그를 기록할 수 없습니다. (SEQ: {frame_seq}, EVT: {event_type})")
+        for ev in events:
+            seq, evt = (ev[0], ev[2]) if isinstance(ev, tuple) else (ev.get('frame_seq'), ev.get('event_type'))
+            if isinstance(evt, int): evt = EVENT_NAMES[evt]
+            tx_internal_logger.warning("로그 파일이 준비되지 않아 이벤트 로그를 기록할 수 없습니다. (SEQ: %s, EVT: %s)", seq, evt)
         return
 
-    # row_dict에 payload_hex 필드 추가
-    row_dict = {
-        "log_timestamp_utc": "", "frame_seq": frame_seq, "attempt_num_for_frame": attempt_num,
-        "event_type": event_type, "total_attempts_for_frame": "", "ack_received_final": "",
-        "payload_hex": "", "timestamp_sent_utc": "", "timestamp_ack_interaction_end_utc": ""
-    }
-    
-    try:
-        # 타임스탬프 포맷팅
-        log_ts_utc_iso = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds") + "Z"
-        ts_sent_utc_iso = ts_sent.isoformat(timespec="milliseconds") + "Z" if ts_sent else ''
-        ts_ack_interaction_end_utc_iso = ts_ack_interaction_end.isoformat(timespec="milliseconds") + "Z" if ts_ack_interaction_end else ''
-        
-        # 페이로드를 hex 문자열로 변환
-        payload_hex_str = binascii.hexlify(payload).decode('ascii') if payload else ''
-
-        # row_dict 업데이트
-        row_dict.update({
-            "log_timestamp_utc": log_ts_utc_iso,
-            "frame_seq": frame_seq,
-            "attempt_num_for_frame": attempt_num,
-            "event_type": event_type,
-            "total_attempts_for_frame": total_attempts_final if total_attempts_final is not None else '',
-            "ack_received_final": ack_received_final if ack_received_final is not None else '',
-            "payload_hex": payload_hex_str,
-            "timestamp_sent_utc": ts_sent_utc_iso,
-            "timestamp_ack_interaction_end_utc": ts_ack_interaction_end_utc_iso
-        })
-        
-        # CSV 파일에 쓰기
-        row_list = [row_dict.get(header, '') for header in CSV_HEADER]
-        with open(_log_file_path, mode='a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(row_list)
-            
-    except (IOError, OSError) as e:
-        tx_internal_logger.error(f"송신 로그 기록 실패 ({_log_file_path}): {e} | 데이터: {row_dict}")
-    except Exception as e:
-        tx_internal_logger.error(f"송신 로그 기록 중 예기치 않은 오류: {e} | 데이터: {row_dict}", exc_info=False)
+    try: _write_events(events, flush)
+    except Exception as e: _log_write_failure(events, e)
+
+
+def _write_events(events: List[Union[Dict[str, Any], TxEvent]], flush: bool):
+    # 정상 경로: 행 문자열만 만들어 한 번에 쓴다 (진단용 dict는 만들지 않음)
+    rows = [_build_row(*ev) if isinstance(ev, tuple) else _build_row(**ev) for ev in events]
+    with _file_lock:
+        if _log_fp is None: return
+        _log_fp.write("".join(rows))
+        if flush: _log_fp.flush()
+
+
+def _log_write_failure(events: List[Union[Dict[str, Any], TxEvent]], e: Exception):
+    # 실패했을 때만: 행 변환이 깨진 이벤트를 찾아 열 이름을 붙여 남긴다
+    if isinstance(e, (IOError, OSError)):
+        tx_internal_logger.error("송신 로그 기록 실패 (%s): %s | 데이터: %r", _log_file_path, e, events); return
+    for ev in events:
+        try: _build_row(*ev) if isinstance(ev, tuple) else _build_row(**ev)
+        except Exception as row_e:
+            e, events = row_e, dict(zip(_TX_EVENT_FIELDS, ev)) if isinstance(ev, tuple) else ev
+            break
+    tx_internal_logger.error("송신 로그 기록 중 예기치 않은 오류: %s | 데이터: %r", e, events, exc_info=False)
+
+
+# --- 비동기 기록 (송신 루프에서 파일 I/O 분리) ---
+# 기록 스레드가 디스크에 막혀도 메모리가 무한정 늘지 않도록 대기 묶음 수를 제한한다
+WRITER_QUEUE_MAX_BATCHES = 1024
+_write_queue: "queue.Queue[List[Union[Dict[str, Any], TxEvent]]]" = queue.Queue(maxsize=WRITER_QUEUE_MAX_BATCHES)
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+# 기록 스레드가 한 번에 모아 쓰는 최대 이벤트 수 (큐에 쌓인 묶음들의 행을 합쳐 write 한 번으로 기록한다)
+WRITER_DRAIN_MAX_EVENTS = 64
+
+
+def _writer_loop():
+    while True:
+        events = list(_write_queue.get()); taken = 1
+        while len(events) < WRITER_DRAIN_MAX_EVENTS:
+            try: events.extend(_write_queue.get_nowait()); taken += 1
+            except queue.Empty: break
+        try:
+            # 뒤에 대기 중인 묶음이 있으면 버퍼에만 쌓고, 큐가 비어 쉬게 될 때 한 번 flush 한다
+            log_tx_events_batch(events, flush=_write_queue.empty())
+        finally:
+            for _ in range(taken): _write_queue.task_done()
+
+
+def log_tx_events_async(events: Iterable[Union[Dict[str, Any], TxEvent]]):
+    """
+    이벤트 묶음을 백그라운드 기록 스레드에 넘기고 바로 반환합니다.
+    기록 시각이 밀리지 않도록 각 이벤트에 ts_logged를 채워서 넘겨야 합니다.
+    송신 루프에서는 dict 대신 TxEvent 튜플(event_type은 EVT_* ID)을 넘기면 변환 비용이 가장 적습니다.
+    """
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer_loop, name="tx_logger", daemon=True)
+            _writer_thread.start()
+    events = list(events)
+    try: _write_queue.put_nowait(events)
+    except queue.Full:
+        # 큐가 가득 차면 버리지 않고 자리가 날 때까지 기다린다 (직접 쓰면 앞선 묶음보다 먼저 기록되어 행 순서가 뒤바뀜)
+        tx_internal_logger.warning("송신 로그 큐 가득 참 (%d 묶음), 기록 스레드를 기다림", WRITER_QUEUE_MAX_BATCHES)
+        _write_queue.put(events)
+
+
+def flush_tx_log():
+    """
+    대기 중인 비동기 기록이 모두 파일에 쓰일 때까지 기다립니다.
+    """
+    _write_queue.join()
+
+
+def _shutdown_tx_log():
+    flush_tx_log(); _close_session_log_file()
+
+
+atexit.register(_shutdown_tx_log)
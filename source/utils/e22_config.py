@@ -1,6 +1,11 @@
 import serial
 import argparse
-import time
+import itertools
+import struct
+
+# 응답 대기: 전체 상한(초)과, 첫 바이트 이후 이 시간 이상 끊기면 응답이 끝난 것으로 본다(초)
+RESPONSE_TIMEOUT = 1
+INTER_BYTE_TIMEOUT = 0.02
 
 # ---------- 설정 가능한 값 매핑 ----------
 
@@ -32,33 +37,44 @@ ADR_BITS = {
     "62.5k": 0b111,
 }
 
-BAUD_REV = {v: k for k, v in BAUD_BITS.items()}
-PARITY_REV = {v: k for k, v in PARITY_BITS.items()}
-ADR_REV = {v: k for k, v in ADR_BITS.items()}
+# 비트값이 0부터 빈틈없이 이어지므로 역매핑은 비트값으로 바로 인덱싱하는 튜플로 둔다
+BAUD_REV = tuple(sorted(BAUD_BITS, key=BAUD_BITS.get))
+PARITY_REV = tuple(sorted(PARITY_BITS, key=PARITY_BITS.get)) + ("8N1",)  # 0b11은 데이터시트상 8N1과 동일
+ADR_REV = tuple(sorted(ADR_BITS, key=ADR_BITS.get))
+
+
+# (baud, parity, adr) 조합별 REG0 값을 import 시 한 번만 계산해 둔다 (8 x 3 x 8 = 192개)
+_REG0_TABLE = {
+    (b, p, a): (BAUD_BITS[b] << 5) | (PARITY_BITS[p] << 3) | ADR_BITS[a]
+    for b, p, a in itertools.product(BAUD_BITS, PARITY_BITS, ADR_BITS)
+}
 
 
 def build_reg0(baud, parity, adr):
-    return (BAUD_BITS[baud] << 5) | (PARITY_BITS[parity] << 3) | ADR_BITS[adr]
+    return _REG0_TABLE[(baud, parity, adr)]
+
+
+def decode_reg0(reg0):
+    return BAUD_REV[(reg0 >> 5) & 0b111], PARITY_REV[(reg0 >> 3) & 0b11], ADR_REV[reg0 & 0b111]
+
+
+# 명령 종류별 헤더와 [시작 레지스터, 길이, ADDH, ADDL, NETID, REG0, REG2] 본문
+_CMD_PREFIX = {"save": b"\xC0", "temp": b"\xC2", "wireless": b"\xCF\xCF\xC2"}
+_CONFIG_BODY = struct.Struct(">7B")
 
 
 def send_config(cmd_type, addr_high, addr_low, netid, reg0, reg2, port, baudrate):
-    base_cmd = []
-    if cmd_type == "save":
-        base_cmd = [0xC0]
-    elif cmd_type == "temp":
-        base_cmd = [0xC2]
-    elif cmd_type == "wireless":
-        base_cmd = [0xCF, 0xCF, 0xC2]
-    else:
+    prefix = _CMD_PREFIX.get(cmd_type)
+    if prefix is None:
         raise ValueError("명령 형식 오류: save/temp/wireless 중 하나여야 함")
 
-    packet = bytes(base_cmd + [0x00, 0x05, addr_high, addr_low, netid, reg0, reg2])
+    packet = prefix + _CONFIG_BODY.pack(0x00, 0x05, addr_high, addr_low, netid, reg0, reg2)
     print(f"▶️ 전송 ({cmd_type}): {packet.hex().upper()}")
 
-    with serial.Serial(port, baudrate, timeout=1) as ser:
+    with serial.Serial(port, baudrate, timeout=RESPONSE_TIMEOUT, inter_byte_timeout=INTER_BYTE_TIMEOUT) as ser:
         ser.write(packet)
-        time.sleep(0.1)
-        resp = ser.read_all()
+        # 정상 응답은 명령과 같은 길이(C1/CF CF C1 + 파라미터). 오류(FF FF FF)는 바이트 간격 타임아웃으로 끝난다
+        resp = ser.read(len(packet))
         print(f"✅ 응답: {resp.hex().upper()}")
 
         if resp.startswith(b'\xFF\xFF\xFF'):
@@ -73,10 +89,9 @@ def send_config(cmd_type, addr_high, addr_low, netid, reg0, reg2, port, baudrate
 
 def read_config(port, baudrate):
     read_cmd = bytes([0xC1, 0x00, 0x05])
-    with serial.Serial(port, baudrate, timeout=1) as ser:
+    with serial.Serial(port, baudrate, timeout=RESPONSE_TIMEOUT, inter_byte_timeout=INTER_BYTE_TIMEOUT) as ser:
         ser.write(read_cmd)
-        time.sleep(0.1)
-        resp = ser.read_all()
+        resp = ser.read(8)  # C1 00 05 + 파라미터 5바이트
         print(f"\n 읽기 응답: {resp.hex().upper()}")
 
         if not resp.startswith(b'\xC1\x00\x05') or len(resp) < 8:
@@ -89,9 +104,7 @@ def read_config(port, baudrate):
         reg0 = resp[6]
         reg2 = resp[7]
 
-        baud = BAUD_REV[(reg0 >> 5) & 0b111]
-        parity = PARITY_REV[(reg0 >> 3) & 0b11]
-        adr = ADR_REV[reg0 & 0b111]
+        baud, parity, adr = decode_reg0(reg0)
 
         freq = 850.125 + reg2 * 1.0
 